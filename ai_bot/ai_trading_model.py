@@ -1,43 +1,130 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from sklearn.preprocessing import MinMaxScaler
-import matplotlib.pyplot as plt
-import yfinance as yf
 import subprocess
+import asyncio
+import re
 import sys
 import os
+import hashlib
+import inspect
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from monitoring import TradingMonitor
 
+try:
+    import tensorrt as trt
+    import pycuda.driver as cuda
+    TENSORRT_AVAILABLE = True
+except ImportError:
+    TENSORRT_AVAILABLE = False
+
+try:
+    from execution.icp_agent import ICPCanisterClient, load_dfx_identity
+    IC_PY_AVAILABLE = True
+except ImportError:
+    IC_PY_AVAILABLE = False
+
+# Trained/converted artifacts are cached here so re-runs can skip training
+CACHE_DIR = ".cache"
+
+# Largest batch the TensorRT engine is built for; longer inputs run in chunks
+TRT_MAX_BATCH = 512
+
+# btc/eth values in dfx's text rendering of the Portfolio record; handles signs,
+# exponents and Candid's digit separators, and ignores the record's other fields
+_PORTFOLIO_FIELD_RE = re.compile(r'\b(btc|eth)\s*=\s*(-?[\d_]+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+
+# dfx project next to ai_bot/, independent of the working directory
+MOTOKO_PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "motoko_contracts")
+
+# Plots block on a GUI window, so they are opt-in (SHOW_PLOTS=1) for headless runs
+SHOW_PLOTS = os.environ.get('SHOW_PLOTS', '0') == '1'
+
+# TensorFlow is imported on first use so the parent process (monitoring,
+# plotting, canister calls) never pays for it; only the training workers do.
+@functools.lru_cache(maxsize=None)
+def _import_tensorflow():
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
+    import tensorflow as tf
+    from tensorflow.keras import mixed_precision
+
+    # Run the LSTM matmuls in FP16 on Tensor Core GPUs; CPU-only hosts stay in FP32
+    # since float16 kernels are slower there. XLA fuses the cell ops either way.
+    if tf.config.list_physical_devices('GPU'):
+        mixed_precision.set_global_policy('mixed_float16')
+    tf.config.optimizer.set_jit(True)
+    tf.keras.backend.set_floatx('float32')
+    return tf
+
 # We'll keep your existing structure, but add a second asset (ETH) so we can
 # store two predictions in the canister and then rebalance.
 
+# Path of cached market data for one asset/date range
+def _cache_path(ticker, start, end, ext):
+    return os.path.join(CACHE_DIR, f"{ticker}_{start}_{end}{ext}")
+
+# Cache path prefix (.keras/.tflite/.plan) for a trained model. The key covers
+# the data range, window length, the model-building code and, for fine-tuned
+# models, the base model, so editing any of them invalidates the cache.
+def _model_cache_base(ticker, start, end, sequence_length, base_model_path=None):
+    arch = inspect.getsource(build_lstm_model)
+    key = hashlib.sha1(
+        f"{ticker}|{start}|{end}|{sequence_length}|{base_model_path or ''}|{arch}".encode()
+    ).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{ticker}_{key}")
+
 # Fetch real market data
 def fetch_market_data(ticker="BTC-USD", start="2021-01-01", end="2022-01-01"):
+    cache_path = _cache_path(ticker, start, end, ".parquet")
+    if os.path.exists(cache_path):
+        print(f"Loading cached market data for {ticker} from {cache_path}")
+        return pd.read_parquet(cache_path, engine='pyarrow').astype(np.float32, copy=False)
+
     print(f"Fetching market data for {ticker} from {start} to {end}...")
+    import yfinance as yf
     df = yf.download(ticker, start=start, end=end)
     print("Data fetched successfully.")
     print(df.head())
     df = df[['Close']]
     df.dropna(inplace=True)
+    # Keep prices in float32 from here on; nothing downstream needs float64
+    df = df.astype(np.float32, copy=False)
+
+    # Parquet needs flat string column names; newer yfinance returns (field, ticker)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df.to_parquet(cache_path, engine='pyarrow')
     return df
 
+# Min/max scaler for a single price series; only inverse_transform is needed
+class _Scaler:
+    __slots__ = ('mn', 'scale')
+
+    def __init__(self, mn, scale):
+        self.mn = mn
+        self.scale = scale
+
+    def inverse_transform(self, x):
+        return x / self.scale + self.mn
+
 # Preprocess data for LSTM
 def preprocess_data(df, sequence_length=60):
     print("Preprocessing data...")
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(df['Close'].values.reshape(-1, 1))
-    
-    X, y = [], []
-    for i in range(sequence_length, len(scaled_data)):
-        X.append(scaled_data[i-sequence_length:i, 0])
-        y.append(scaled_data[i, 0])
+    closes = df['Close'].to_numpy(dtype=np.float32).ravel()
+    mn = closes.min()
+    data_range = closes.max() - mn
+    scale = np.float32(1.0) / data_range if data_range > 0 else np.float32(1.0)
+    scaled_data = (closes - mn) * scale
+    scaler = _Scaler(mn, scale)
     
-    X = np.array(X)
-    y = np.array(y)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    # Zero-copy strided view over the series; the last window has no target
+    windows = sliding_window_view(scaled_data, sequence_length)
+    X = windows[:-1, :, None]
+    y = scaled_data[sequence_length:]
     
     print(f"Processed {len(X)} samples.")
     return X, y, scaler
@@ -45,181 +132,452 @@ def preprocess_data(df, sequence_length=60):
 # Build the LSTM model
 def build_lstm_model(input_shape):
     print("Building LSTM model...")
+    _import_tensorflow()
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+
+    # Stick to the cuDNN-eligible LSTM config (no recurrent dropout, no unroll)
+    # so GPUs run one fused kernel per layer; Dropout stays between layers
+    cudnn_kwargs = dict(activation='tanh', recurrent_activation='sigmoid',
+                        recurrent_dropout=0, unroll=False, use_bias=True)
     model = Sequential([
-        LSTM(units=50, return_sequences=True, input_shape=input_shape),
+        LSTM(units=50, return_sequences=True, input_shape=input_shape, **cudnn_kwargs),
         Dropout(0.2),
-        LSTM(units=50, return_sequences=False),
+        LSTM(units=50, return_sequences=False, **cudnn_kwargs),
         Dropout(0.2),
         Dense(units=25),
-        Dense(units=1)
+        Dense(units=1, dtype='float32')  # Keep the regression output in FP32
     ])
-    model.compile(optimizer='adam', loss='mean_squared_error')
+    model.compile(optimizer='adam', loss='mean_squared_error', jit_compile=True)
     print("Model built successfully.")
     return model
 
+# Input pipeline for model.fit: cached in memory after the first epoch and
+# prefetched so batch staging overlaps with the train step
+def _make_dataset(X_train, y_train, batch_size):
+    tf = _import_tensorflow()
+    ds = tf.data.Dataset.from_tensor_slices((
+        np.asarray(X_train, dtype=np.float32),
+        np.asarray(y_train, dtype=np.float32)
+    ))
+    return ds.cache().shuffle(len(X_train)).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
 # Train model function
-def train_model(model, X_train, y_train, epochs=10, batch_size=32):
+def train_model(model, X_train, y_train, epochs=10, batch_size=256):
     print("Training model...")
-    model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size)
+    model.fit(_make_dataset(X_train, y_train, batch_size), epochs=epochs)
     print("Model training complete.")
     return model
 
-# Predict future prices
+# Reuse another asset's trained LSTM stack and only fit the dense head
+def fine_tune_model(base_model_path, X_train, y_train, epochs=3, batch_size=256):
+    print(f"Fine-tuning dense head from {base_model_path}...")
+    tf = _import_tensorflow()
+    model = tf.keras.models.load_model(base_model_path)
+    for layer in model.layers[:-2]:
+        layer.trainable = False
+    # Recompile so the frozen layers drop out of the optimizer
+    model.compile(optimizer='adam', loss='mean_squared_error', jit_compile=True)
+    model.fit(_make_dataset(X_train, y_train, batch_size), epochs=epochs)
+    print("Model fine-tuning complete.")
+    return model
+
+# Predict future prices. The inverse min/max scaling is folded into the same
+# XLA-compiled function so it fuses with the output layer on device.
 def predict_prices(model, X_test, scaler):
     print("Making predictions...")
-    predictions = model.predict(X_test)
+    tf = _import_tensorflow()
+    inv_scale = tf.constant(1.0 / scaler.scale, dtype=tf.float32)
+    offset = tf.constant(scaler.mn, dtype=tf.float32)
+
+    @tf.function(jit_compile=True)
+    def infer(x):
+        return tf.cast(model(x, training=False), tf.float32) * inv_scale + offset
+
+    predictions = infer(tf.convert_to_tensor(X_test, dtype=tf.float32)).numpy()
+    print("Predictions generated.")
+    return predictions
+
+# Prune to 50% sparsity and cluster weights into 16 centroids with short
+# fine-tuning passes, for the TFLite export only. The trained model is left
+# untouched; without tfmot (or on failure) it is returned as is.
+def compress_model(model, X_train, y_train, epochs=2, batch_size=256):
+    try:
+        import tensorflow_model_optimization as tfmot
+    except ImportError:
+        return model
+
+    print("Pruning and clustering model for TFLite export...")
+    tf = _import_tensorflow()
+    try:
+        ds = _make_dataset(X_train, y_train, batch_size)
+        end_step = epochs * int(np.ceil(len(X_train) / batch_size))
+
+        # Work on a copy so the cached/TensorRT model keeps its dense weights
+        base = tf.keras.models.clone_model(model)
+        base.set_weights(model.get_weights())
+
+        pruned = tfmot.sparsity.keras.prune_low_magnitude(
+            base,
+            pruning_schedule=tfmot.sparsity.keras.PolynomialDecay(
+                initial_sparsity=0.0, final_sparsity=0.5, begin_step=0, end_step=end_step
+            )
+        )
+        pruned.compile(optimizer='adam', loss='mean_squared_error')
+        pruned.fit(ds, epochs=epochs, callbacks=[tfmot.sparsity.keras.UpdatePruningStep()])
+        pruned = tfmot.sparsity.keras.strip_pruning(pruned)
+
+        clustered = tfmot.clustering.keras.cluster_weights(
+            pruned,
+            number_of_clusters=16,
+            cluster_centroids_init=tfmot.clustering.keras.CentroidInitialization.KMEANS_PLUS_PLUS,
+            preserve_sparsity=True  # Keep pruned zeros at zero instead of pulling them onto a centroid
+        )
+        clustered.compile(optimizer='adam', loss='mean_squared_error')
+        clustered.fit(ds, epochs=1)
+        compressed = tfmot.clustering.keras.strip_clustering(clustered)
+    except Exception as e:
+        print(f"Model compression failed ({e}), exporting the uncompressed model.")
+        return model
+
+    kernels = [w.numpy() for w in compressed.weights if 'kernel' in w.name]
+    zeros = sum(int(np.count_nonzero(k == 0)) for k in kernels)
+    total = sum(k.size for k in kernels)
+    print(f"Model compression complete, kernel sparsity {zeros / max(total, 1):.1%}.")
+    return compressed
+
+# Convert a trained model to an int8-quantized TFLite flatbuffer
+def convert_to_tflite(model, X_train, path):
+    print("Converting model to int8 TFLite...")
+    tf = _import_tensorflow()
+
+    def representative_dataset():
+        for i in range(min(100, len(X_train))):
+            yield [X_train[i:i + 1].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    tflite_model = converter.convert()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"TFLite model saved to {path}")
+    return tflite_model
+
+# Predict future prices with the TFLite interpreter
+def predict_prices_tflite(tflite_model, X_test, scaler):
+    print("Making predictions with TFLite...")
+    tf = _import_tensorflow()
+    interpreter = tf.lite.Interpreter(model_content=tflite_model)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+
+    # Quantize inputs once; the converted LSTM has a fixed batch size of 1
+    in_scale, in_zero_point = input_details['quantization']
+    X_q = np.clip(np.round(X_test / in_scale + in_zero_point), -128, 127).astype(np.int8)
+
+    predictions = np.empty((len(X_test), 1), dtype=np.float32)
+    for i in range(len(X_q)):
+        interpreter.set_tensor(input_details['index'], X_q[i:i + 1])
+        interpreter.invoke()
+        predictions[i] = interpreter.get_tensor(output_details['index']).reshape(-1)[:1]
+
+    if output_details['dtype'] == np.int8:
+        out_scale, out_zero_point = output_details['quantization']
+        predictions = (predictions - out_zero_point) * out_scale
+
+    predictions = scaler.inverse_transform(predictions)
+    print("Predictions generated.")
+    return predictions
+
+# Export a trained model to ONNX and build an FP16 TensorRT engine from it.
+# INT8 is skipped here since it tends to hurt LSTM accuracy more than it helps.
+def convert_to_tensorrt(model, sequence_length, path):
+    print("Converting model to FP16 TensorRT engine...")
+    tf = _import_tensorflow()
+    import tf2onnx
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    spec = (tf.TensorSpec((None, sequence_length, 1), tf.float32, name='input'),)
+    onnx_model, _ = tf2onnx.convert.from_keras(
+        model, input_signature=spec, opset=15,
+        output_path=os.path.splitext(path)[0] + '.onnx'
+    )
+
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+    if not parser.parse(onnx_model.SerializeToString()):
+        raise RuntimeError(f"ONNX parse failed: {parser.get_error(0)}")
+
+    config = builder.create_builder_config()
+    config.set_flag(trt.BuilderFlag.FP16)
+    profile = builder.create_optimization_profile()
+    input_name = network.get_input(0).name
+    profile.set_shape(input_name, (1, sequence_length, 1),
+                      (TRT_MAX_BATCH, sequence_length, 1), (TRT_MAX_BATCH, sequence_length, 1))
+    config.add_optimization_profile(profile)
+
+    engine_bytes = builder.build_serialized_network(network, config)
+    if engine_bytes is None:
+        raise RuntimeError("TensorRT engine build failed")
+    engine_bytes = bytes(engine_bytes)
+    with open(path, 'wb') as f:
+        f.write(engine_bytes)
+    print(f"TensorRT engine saved to {path}")
+    return engine_bytes
+
+# Predict future prices with a TensorRT engine on a single CUDA stream
+def predict_prices_tensorrt(engine_bytes, X_test, scaler):
+    print("Making predictions with TensorRT...")
+    import pycuda.autoinit  # noqa: F401  creates the CUDA context on first use
+
+    runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+    engine = runtime.deserialize_cuda_engine(engine_bytes)
+    context = engine.create_execution_context()
+    stream = cuda.Stream()
+
+    # Pinned host buffers and device buffers are allocated once for the max batch
+    sequence_length = X_test.shape[1]
+    h_in = cuda.pagelocked_empty((TRT_MAX_BATCH, sequence_length, 1), np.float32)
+    h_out = cuda.pagelocked_empty((TRT_MAX_BATCH, 1), np.float32)
+    d_in = cuda.mem_alloc(h_in.nbytes)
+    d_out = cuda.mem_alloc(h_out.nbytes)
+
+    predictions = np.empty((len(X_test), 1), dtype=np.float32)
+    for start in range(0, len(X_test), TRT_MAX_BATCH):
+        batch = X_test[start:start + TRT_MAX_BATCH]
+        n = len(batch)
+        h_in[:n] = batch
+        context.set_binding_shape(0, (n, sequence_length, 1))
+        cuda.memcpy_htod_async(d_in, h_in, stream)
+        context.execute_async_v2([int(d_in), int(d_out)], stream.handle)
+        cuda.memcpy_dtoh_async(h_out, d_out, stream)
+        stream.synchronize()
+        predictions[start:start + n] = h_out[:n]
+
     predictions = scaler.inverse_transform(predictions)
     print("Predictions generated.")
     return predictions
 
+# Train (or load a cached engine/model) and predict the test set. GPU hosts
+# use TensorRT when it is installed, everything else uses int8 TFLite.
+# With base_model_path the LSTM stack is transferred and only the head is fit.
+def train_and_predict(model_base, X_train, y_train, X_test, scaler, base_model_path=None):
+    tf = _import_tensorflow()
+    use_tensorrt = TENSORRT_AVAILABLE and bool(tf.config.list_physical_devices('GPU'))
+    engine_path = model_base + ".plan"
+    tflite_path = model_base + ".tflite"
+    keras_path = model_base + ".keras"
+
+    if use_tensorrt and os.path.exists(engine_path):
+        print(f"Loading cached TensorRT engine from {engine_path}")
+        with open(engine_path, 'rb') as f:
+            return predict_prices_tensorrt(f.read(), X_test, scaler)
+    if not use_tensorrt and os.path.exists(tflite_path):
+        print(f"Loading cached TFLite model from {tflite_path}")
+        with open(tflite_path, 'rb') as f:
+            return predict_prices_tflite(f.read(), X_test, scaler)
+
+    if os.path.exists(keras_path):
+        print(f"Loading cached Keras model from {keras_path}")
+        model = tf.keras.models.load_model(keras_path)
+    else:
+        if base_model_path and os.path.exists(base_model_path):
+            model = fine_tune_model(base_model_path, X_train, y_train, epochs=3)
+        else:
+            model = build_lstm_model((X_train.shape[1], 1))
+            model = train_model(model, X_train, y_train, epochs=10)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        model.save(keras_path)
+
+    if use_tensorrt:
+        try:
+            engine_bytes = convert_to_tensorrt(model, X_train.shape[1], engine_path)
+            return predict_prices_tensorrt(engine_bytes, X_test, scaler)
+        except Exception as e:
+            print(f"TensorRT conversion failed ({e}), falling back to TFLite.")
+
+    try:
+        tflite_model = convert_to_tflite(compress_model(model, X_train, y_train), X_train, tflite_path)
+    except Exception as e:
+        print(f"TFLite conversion failed ({e}), falling back to Keras inference.")
+        return predict_prices(model, X_test, scaler)
+    return predict_prices_tflite(tflite_model, X_test, scaler)
+
+# Let concurrent workers share one GPU instead of each reserving all of its memory
+def _init_worker():
+    tf = _import_tensorflow()
+    for gpu in tf.config.list_physical_devices('GPU'):
+        tf.config.experimental.set_memory_growth(gpu, True)
+
+# Fetch, train and predict a single asset (runs in its own worker process)
+def run_asset(ticker, start="2021-01-01", end="2022-01-01", sequence_length=60, base_model_path=None):
+    df = fetch_market_data(ticker=ticker, start=start, end=end)
+    X, y, scaler = preprocess_data(df, sequence_length=sequence_length)
+
+    split_idx = int(len(X) * 0.8)
+    model_base = _model_cache_base(ticker, start, end, sequence_length, base_model_path)
+    predictions = train_and_predict(
+        model_base,
+        X[:split_idx], y[:split_idx], X[split_idx:], scaler,
+        base_model_path=base_model_path
+    )
+
+    return {
+        'predictions': predictions,
+        'model_path': model_base + ".keras",
+        'actual_test': df['Close'].to_numpy()[sequence_length + split_idx:],
+        'current_price': float(df['Close'].iloc[-1])
+    }
+
+
+# Plot actual vs predicted test prices for one asset (set SHOW_PLOTS=1 to enable)
+def plot_results(ticker, actual, predictions, actual_color, predicted_color, block=True):
+    import matplotlib.pyplot as plt
+
+    asset = ticker.split('-')[0]
+    plt.figure(figsize=(12,6))
+    plt.plot(range(len(actual)), actual, label=f'{asset} Actual', color=actual_color)
+    plt.plot(range(len(predictions)), predictions, label=f'{asset} Predicted', color=predicted_color)
+    plt.title(f'{ticker} Price Prediction')
+    plt.xlabel('Time')
+    plt.ylabel('Price')
+    plt.legend()
+    plt.show(block=block)
+
+# Store predictions, rebalance and read the portfolio back with one update
+# call, talking to the local replica directly instead of spawning dfx. Calls
+# are signed with the dfx identity (DFX_IDENTITY_PEM overrides its PEM path)
+async def sync_canister_agent(btc_pred, eth_pred, project_dir=MOTOKO_PROJECT_DIR):
+    canister_id = ICPCanisterClient.resolve_canister_id(project_dir, use_mainnet=False)
+    identity = load_dfx_identity(pem_path=os.getenv('DFX_IDENTITY_PEM'))
+    client = ICPCanisterClient(canister_id, use_mainnet=False, identity=identity)
+
+    portfolio = await client.set_and_rebalance(btc_pred, eth_pred)
+    print("Stored predictions and rebalanced on-chain.")
+    print("Updated portfolio:", portfolio)
+    return {'BTC': portfolio['btc'], 'ETH': portfolio['eth']}
+
+# Fallback for hosts without ic-py: run dfx as an async subprocess so the
+# event loop stays free while it starts up and talks to the replica
+async def _dfx_call(canister_name, method, args=None, project_dir=MOTOKO_PROJECT_DIR):
+    cmd = ["dfx", "canister", "call", canister_name, method]
+    if args:
+        cmd.append(args)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=project_dir,  # folder where dfx.json exists
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    out, err = await proc.communicate()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
+    return out.decode().strip()
+
+async def sync_canister_dfx(btc_pred, eth_pred, canister_name="motoko_contracts_backend"):
+    portfolio_str = await _dfx_call(canister_name, "setAndRebalance", f"({btc_pred}, {eth_pred})")
+    print("Stored predictions and rebalanced on-chain.")
+    print("Updated portfolio:", portfolio_str)
+
+    # Pull btc/eth by field name out of (record { btc = X : float64; eth = Y : float64; ... })
+    fields = dict(_PORTFOLIO_FIELD_RE.findall(portfolio_str))
+    if 'btc' in fields and 'eth' in fields:
+        return {'BTC': float(fields['btc'].replace('_', '')), 'ETH': float(fields['eth'].replace('_', ''))}
+    return None
 
 if __name__ == "__main__":
     # Initialize trading monitor
     monitor = TradingMonitor()
 
     # -----------------------------
-    # 1. BTC Prediction
+    # 1. Train BTC, then transfer its LSTM stack to ETH
     # -----------------------------
-    df_btc = fetch_market_data(
-        ticker="BTC-USD", 
-        start="2021-01-01", 
-        end="2022-01-01"
-    )
-    X_btc, y_btc, scaler_btc = preprocess_data(df_btc, sequence_length=60)
+    # Workers use spawn to keep TF/CUDA state out of the parent. ETH data is
+    # downloaded while BTC trains; ETH then only fine-tunes the dense head.
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    ) as pool:
+        eth_data = pool.submit(fetch_market_data, "ETH-USD")
+        btc_result = pool.submit(run_asset, "BTC-USD").result()
+        eth_data.result()
+        eth_result = pool.submit(
+            run_asset, "ETH-USD", base_model_path=btc_result['model_path']
+        ).result()
 
-    split_idx_btc = int(len(X_btc) * 0.8)
-    X_btc_train, y_btc_train = X_btc[:split_idx_btc], y_btc[:split_idx_btc]
-    X_btc_test, y_btc_test = X_btc[split_idx_btc:], y_btc[split_idx_btc:]
-
-    model_btc = build_lstm_model((X_btc_train.shape[1], 1))
-    model_btc = train_model(model_btc, X_btc_train, y_btc_train, epochs=10, batch_size=32)
-
-    predictions_btc = predict_prices(model_btc, X_btc_test, scaler_btc)
+    # -----------------------------
+    # 2. BTC Prediction
+    # -----------------------------
+    predictions_btc = btc_result['predictions']
     # We'll just print the final BTC predicted price (last test sample)
     final_btc_pred = float(predictions_btc[-1][0])
     print(f"Final BTC predicted price: {final_btc_pred}")
 
     # Validate and log BTC prediction
-    current_btc_price = float(df_btc['Close'].iloc[-1])
+    current_btc_price = btc_result['current_price']
     if monitor.log_prediction("BTC-USD", final_btc_pred, current_btc_price):
         print("BTC prediction validated and logged")
     else:
         print("Warning: BTC prediction seems unusual, proceeding with caution")
 
     # Evaluate BTC performance for reference
-    actual_btc = df_btc['Close'].values[60:]
-    actual_btc_test = actual_btc[split_idx_btc:]
+    actual_btc_test = btc_result['actual_test']
 
-    from sklearn.metrics import mean_squared_error, mean_absolute_error
-    rmse_btc = np.sqrt(mean_squared_error(actual_btc_test, predictions_btc))
-    mae_btc = mean_absolute_error(actual_btc_test, predictions_btc)
+    errors_btc = predictions_btc.ravel() - actual_btc_test.ravel()
+    rmse_btc = np.sqrt(np.mean(errors_btc ** 2))
+    mae_btc = np.mean(np.abs(errors_btc))
     print(f"BTC RMSE: {rmse_btc:.2f}")
     print(f"BTC MAE: {mae_btc:.2f}")
 
     # -----------------------------
-    # 2. ETH Prediction
+    # 3. ETH Prediction
     # -----------------------------
-    df_eth = fetch_market_data(
-        ticker="ETH-USD", 
-        start="2021-01-01", 
-        end="2022-01-01"
-    )
-    X_eth, y_eth, scaler_eth = preprocess_data(df_eth, sequence_length=60)
-
-    split_idx_eth = int(len(X_eth) * 0.8)
-    X_eth_train, y_eth_train = X_eth[:split_idx_eth], y_eth[:split_idx_eth]
-    X_eth_test, y_eth_test = X_eth[split_idx_eth:], y_eth[split_idx_eth:]
-
-    model_eth = build_lstm_model((X_eth_train.shape[1], 1))
-    model_eth = train_model(model_eth, X_eth_train, y_eth_train, epochs=10, batch_size=32)
-
-    predictions_eth = predict_prices(model_eth, X_eth_test, scaler_eth)
+    predictions_eth = eth_result['predictions']
     final_eth_pred = float(predictions_eth[-1][0])
     print(f"Final ETH predicted price: {final_eth_pred}")
 
     # Validate and log ETH prediction
-    current_eth_price = float(df_eth['Close'].iloc[-1])
+    current_eth_price = eth_result['current_price']
     if monitor.log_prediction("ETH-USD", final_eth_pred, current_eth_price):
         print("ETH prediction validated and logged")
     else:
         print("Warning: ETH prediction seems unusual, proceeding with caution")
 
-    actual_eth = df_eth['Close'].values[60:]
-    actual_eth_test = actual_eth[split_idx_eth:]
+    actual_eth_test = eth_result['actual_test']
 
-    rmse_eth = np.sqrt(mean_squared_error(actual_eth_test, predictions_eth))
-    mae_eth = mean_absolute_error(actual_eth_test, predictions_eth)
+    errors_eth = predictions_eth.ravel() - actual_eth_test.ravel()
+    rmse_eth = np.sqrt(np.mean(errors_eth ** 2))
+    mae_eth = np.mean(np.abs(errors_eth))
     print(f"ETH RMSE: {rmse_eth:.2f}")
     print(f"ETH MAE: {mae_eth:.2f}")
 
     # -----------------------------
-    # 3. Visualize (Optional)
+    # 4. Visualize (Optional)
     # -----------------------------
-    plt.figure(figsize=(12,6))
-    plt.plot(range(len(actual_btc_test)), actual_btc_test, label='BTC Actual', color='blue')
-    plt.plot(range(len(predictions_btc)), predictions_btc, label='BTC Predicted', color='red')
-    plt.title('BTC-USD Price Prediction')
-    plt.xlabel('Time')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.show(block=False)
-
-    plt.figure(figsize=(12,6))
-    plt.plot(range(len(actual_eth_test)), actual_eth_test, label='ETH Actual', color='green')
-    plt.plot(range(len(predictions_eth)), predictions_eth, label='ETH Predicted', color='orange')
-    plt.title('ETH-USD Price Prediction')
-    plt.xlabel('Time')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.show()
+    if SHOW_PLOTS:
+        plot_results('BTC-USD', actual_btc_test, predictions_btc, 'blue', 'red', block=False)
+        plot_results('ETH-USD', actual_eth_test, predictions_eth, 'green', 'orange')
 
     print("All model testing complete.")
 
     # ---------------------------------------------------------------------
-    # 4. Integration with Motoko canister
+    # 5. Integration with Motoko canister
     # ---------------------------------------------------------------------
     # We'll store both final predictions and then call a rebalance function.
 
     print(f"Storing final BTC = {final_btc_pred}, ETH = {final_eth_pred}")
 
-    canister_name = "motoko_contracts_backend"
-    original_dir = os.getcwd()
-    os.chdir("motoko_contracts")  # change to folder where dfx.json exists
-
-    # setPredictions(btcPred, ethPred)
-    cmd_set = [
-        "dfx", "canister", "call", canister_name,
-        "setPredictions",
-        f"({final_btc_pred}, {final_eth_pred})"
-    ]
-
     try:
-        subprocess.run(cmd_set, check=True)
-        print("Successfully stored predictions on-chain.")
-
-        # Now call rebalance()
-        cmd_rebalance = [
-            "dfx", "canister", "call", canister_name,
-            "rebalance"
-        ]
-        rebalance_res = subprocess.run(cmd_rebalance, check=True, capture_output=True, text=True)
-        print("Rebalance result:", rebalance_res.stdout.strip())
-
-        # Finally, get the updated portfolio
-        cmd_portfolio = [
-            "dfx", "canister", "call", canister_name,
-            "getPortfolio"
-        ]
-        portfolio_res = subprocess.run(cmd_portfolio, check=True, capture_output=True, text=True)
-        print("Updated portfolio:", portfolio_res.stdout.strip())
-
-        # Parse and log portfolio update
-        portfolio_str = portfolio_res.stdout.strip()
-        # Extract numbers from (record { btc = X : float64; eth = Y : float64 })
-        import re
-        numbers = re.findall(r'(\d+\.?\d*)', portfolio_str)
-        if len(numbers) == 2:
-            portfolio = {'BTC': float(numbers[0]), 'ETH': float(numbers[1])}
+        sync_canister = sync_canister_agent if IC_PY_AVAILABLE else sync_canister_dfx
+        portfolio = asyncio.run(sync_canister(final_btc_pred, final_eth_pred))
+
+        if portfolio:
             monitor.log_portfolio_update(
                 portfolio,
                 f"Rebalance based on predictions: BTC={final_btc_pred}, ETH={final_eth_pred}"
@@ -234,8 +592,6 @@ if __name__ == "__main__":
             print(f"Sharpe Ratio: {metrics['sharpe_ratio']:.2f}")
             print(f"Max Drawdown: {metrics['max_drawdown']:.2f}%")
             print(f"Prediction Accuracy: {metrics['prediction_accuracy']:.2f}%")
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print("Error calling canister:", e)
         sys.exit(1)
-    finally:
-        os.chdir(original_dir)
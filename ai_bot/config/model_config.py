@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 import torch
 
-@dataclass
+@dataclass(frozen=True)
 class ModelConfig:
     # Data Configuration
     symbols: List[str] = None
@@ -57,14 +57,15 @@ class ModelConfig:
     technical_indicators: List[str] = None
     
     def __post_init__(self):
+        # Frozen dataclass: defaults have to be filled in through object.__setattr__
         if self.symbols is None:
-            self.symbols = ["BTC/USDT", "ETH/USDT"]
+            object.__setattr__(self, 'symbols', ["BTC/USDT", "ETH/USDT"])
             
         if self.technical_indicators is None:
-            self.technical_indicators = [
+            object.__setattr__(self, 'technical_indicators', [
                 "RSI", "MACD", "BB_UPPER", "BB_LOWER", 
                 "EMA_12", "EMA_26", "ATR", "OBV"
-            ]
+            ])
             
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]) -> 'ModelConfig':
@@ -10,6 +10,12 @@ from .models.transformer_model import CryptoTransformerLightning
 from .training.trainer import ModelTrainer
 from .execution.trading_executor import TradingExecutor
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 class TradingBotController:
@@ -22,8 +28,12 @@ class TradingBotController:
         Args:
             config_path: Path to config file
         """
-        with open(config_path) as f:
-            self.config = json.load(f)
+        if ORJSON_AVAILABLE:
+            with open(config_path, 'rb') as f:
+                self.config = orjson.loads(f.read())
+        else:
+            with open(config_path) as f:
+                self.config = json.load(f)
             
         self.data_module: Optional[CryptoDataModule] = None
         self.model: Optional[CryptoTransformerLightning] = None
@@ -41,7 +51,7 @@ class TradingBotController:
             self.data_module.setup()
             
             # Initialize or load model
-            self.model = self._load_or_train_model()
+            self.model = await self._load_or_train_model()
             
             # Initialize trading executor
             self.executor = TradingExecutor(
@@ -53,7 +63,18 @@ class TradingBotController:
             logger.error(f"Error initializing trading bot: {str(e)}")
             raise
             
-    def _load_or_train_model(self) -> CryptoTransformerLightning:
+    async def aclose(self):
+        """Flush buffered metrics and release network resources held by the bot's components"""
+        if self.executor is not None:
+            self.executor.close()
+        if self.data_module is not None:
+            await self.data_module.aclose()
+            
+    async def _load_or_train_model(self) -> CryptoTransformerLightning:
+        """Load existing model or train a new one without blocking the event loop"""
+        return await asyncio.to_thread(self._load_or_train_model_sync)
+
+    def _load_or_train_model_sync(self) -> CryptoTransformerLightning:
         """Load existing model or train a new one"""
         try:
             # Initialize trainer
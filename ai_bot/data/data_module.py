@@ -1,15 +1,31 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
 import pytorch_lightning as pl
 from torch.utils.data import DataLoader, TensorDataset
 import torch
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 from typing import Dict, List, Optional, Tuple
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from ..data_collectors.crypto_collector import CryptoDataCollector
-from ..features.feature_engineer import FeatureEngineer
+from ..features.feature_engineer import FEATURE_SCHEMA_VERSION, FeatureEngineer
+
+try:
+    import polars
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Prepared sequence tensors are cached here, one file per config
+CACHE_DIR = ".cache"
+
 class CryptoDataModule(pl.LightningDataModule):
     """PyTorch Lightning data module for cryptocurrency data"""
     
@@ -21,6 +37,10 @@ class CryptoDataModule(pl.LightningDataModule):
         self.sequence_length = config.get('data', {}).get('sequence_length', 60)
         self.prediction_horizon = config.get('data', {}).get('prediction_horizon', 12)
         self.batch_size = config.get('training', {}).get('batch_size', 32)
+        self.num_workers = config.get('training', {}).get('num_workers', max(2, (os.cpu_count() or 4) // 2))
+        self.prefetch_factor = config.get('training', {}).get('prefetch_factor', 4)
+        # Dtype the feature windows are kept in; the model upcasts on input
+        self.storage_dtype = getattr(torch, config.get('data', {}).get('storage_dtype', 'bfloat16'))
         
         self.data_collector = CryptoDataCollector(
             symbols=self.symbols,
@@ -32,124 +52,237 @@ class CryptoDataModule(pl.LightningDataModule):
         self.val_data: Optional[TensorDataset] = None
         self.market_data: Optional[pd.DataFrame] = None
         
+        # Latest (sequence_length, n_features) window per symbol and the candle it ends on
+        self._latest_features: Dict[str, np.ndarray] = {}
+        self._last_ts: Dict[str, pd.Timestamp] = {}
+        
+    async def aclose(self):
+        """Close the data collector's network resources"""
+        await self.data_collector.aclose()
+        
     async def prepare_data(self):
-        """Collect and prepare data"""
+        """Collect and prepare data, reusing cached sequences for the current bar"""
         try:
-            logger.info("Collecting market data...")
-            self.market_data = await self.data_collector.collect_data()
-            logger.info(f"Market data shape: {self.market_data.shape}")
-            logger.info(f"Market data columns: {self.market_data.columns.tolist()}")
-            logger.info(f"Unique symbols in market data: {self.market_data['symbol'].unique().tolist()}")
-            
-            logger.info("Engineering features...")
-            features = self.feature_engineer.create_features({
-                'market_data': self.market_data
-            })
-            logger.info(f"Features shape: {features.shape}")
-            logger.info(f"Features columns: {features.columns.tolist()}")
-            logger.info(f"Unique symbols in features: {features['symbol'].unique().tolist()}")
-            
-            # Create sequences for each symbol
-            sequences = []
-            targets = []
-            
-            for symbol in self.symbols:
-                logger.info(f"Processing symbol: {symbol}")
-                symbol_mask = features['symbol'] == symbol
-                logger.info(f"Number of rows for {symbol}: {symbol_mask.sum()}")
-                
-                symbol_features = features[symbol_mask].sort_values('timestamp')
-                logger.info(f"Symbol features shape for {symbol}: {symbol_features.shape}")
-                
-                if symbol_features.empty:
-                    logger.warning(f"No data found for symbol {symbol}")
-                    continue
-                
-                # Convert to numpy for faster processing
-                feature_array = symbol_features.drop(['symbol', 'timestamp'], axis=1).values
-                logger.info(f"Feature array shape for {symbol}: {feature_array.shape}")
-                
-                # Create sequences
-                seq_count = 0
-                for i in range(len(feature_array) - self.sequence_length - self.prediction_horizon + 1):
-                    x = feature_array[i:i + self.sequence_length]
-                    y = feature_array[i + self.sequence_length + self.prediction_horizon - 1, 0]  # Price is first column
-                    sequences.append(x)
-                    targets.append(y)
-                    seq_count += 1
-                
-                logger.info(f"Created {seq_count} sequences for {symbol}")
+            # Calendar timeframes (e.g. 1M) have no fixed bar length, so they aren't cached
+            bar = self._current_bar()
+            cache_path = self._cache_path()
+            cached = None
+            if bar is not None and os.path.exists(cache_path):
+                # Memory-mapped, so DataLoader workers read the same file-backed pages
+                cached = torch.load(cache_path, mmap=True, weights_only=False)
+                if cached.get('bar') != bar:
+                    cached = None
+                    
+            if cached is not None:
+                logger.info(f"Loading cached sequences from {cache_path}")
+                X, y, train_size = cached['X'], cached['y'], cached['train_size']
+                # Scalers fitted on the training data are needed to transform live data
+                self.feature_engineer.scalers = cached['scalers']
+                # Keep market_data set as on a miss; the collector only fetches candles
+                # newer than its persisted history, and the live path reuses the result
+                self.market_data = await self.data_collector.collect_data()
+            else:
+                X, y, train_size = await self._build_sequences()
+                X = X.to(self.storage_dtype)  # Halves dataset and host->device bytes for bf16/fp16
+                if bar is not None:
+                    # One file per config, overwritten each bar so the cache stays bounded
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    tmp_path = f"{cache_path}.tmp"
+                    torch.save({
+                        'X': X, 'y': y, 'train_size': train_size, 'bar': bar,
+                        'scalers': self.feature_engineer.scalers
+                    }, tmp_path)
+                    os.replace(tmp_path, cache_path)
             
-            if not sequences:
-                raise ValueError(f"No sequences could be created. Check the logs for details.")
+            # Rows are laid out train-first (see _build_sequences), so the
+            # chronological split is two views of the same storage
+            self.train_data = TensorDataset(X[:train_size], y[:train_size])
+            self.val_data = TensorDataset(X[train_size:], y[train_size:])
             
-            # Convert to tensors
-            X = torch.tensor(sequences, dtype=torch.float32)
-            y = torch.tensor(targets, dtype=torch.float32).reshape(-1, 1)
+            logger.info(f"Created {len(X)} sequences from {len(self.symbols)} symbols")
+            logger.info(f"Train dataset size: {len(self.train_data)}, Val dataset size: {len(self.val_data)}")
             
-            logger.info(f"Final tensor shapes - X: {X.shape}, y: {y.shape}")
+        except Exception as e:
+            logger.error(f"Error preparing data: {str(e)}")
+            raise
             
-            # Split into train/val
-            train_size = int(0.8 * len(X))
-            indices = torch.randperm(len(X))
+    async def _build_sequences(self) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        """Fetch market data, engineer features and window them into X, y tensors
+        
+        Each symbol's windows are split chronologically (first 80% train), and all
+        train rows are placed before all val rows. Returns X, y and the train size.
+        """
+        logger.info("Collecting market data...")
+        self.market_data = await self.data_collector.collect_data()
+        logger.info(f"Market data shape: {self.market_data.shape}")
+        logger.info(f"Market data columns: {self.market_data.columns.tolist()}")
+        logger.info(f"Unique symbols in market data: {self.market_data['symbol'].unique().tolist()}")
+        
+        logger.info("Engineering features...")
+        features = await self._create_features_parallel(self.market_data)
+        logger.info(f"Features shape: {features.shape}")
+        logger.info(f"Features columns: {features.columns.tolist()}")
+        logger.info(f"Unique symbols in features: {features['symbol'].unique().tolist()}")
+        
+        # Collect per-symbol strided window views; nothing is copied yet
+        sequences = []
+        targets = []
+        symbol_arrays = self._symbol_arrays(features)
+        
+        for symbol in self.symbols:
+            logger.info(f"Processing symbol: {symbol}")
+            feature_array = symbol_arrays.get(symbol)
             
-            train_indices = indices[:train_size]
-            val_indices = indices[train_size:]
+            if feature_array is None:
+                logger.warning(f"No data found for symbol {symbol}")
+                continue
             
-            # Create datasets
-            self.train_data = TensorDataset(
-                X[train_indices],
-                y[train_indices]
-            )
+            logger.info(f"Feature array shape for {symbol}: {feature_array.shape}")
             
-            self.val_data = TensorDataset(
-                X[val_indices],
-                y[val_indices]
-            )
+            windows, target = self._create_sequences(feature_array)
+            if len(windows) == 0:
+                logger.warning(f"Not enough data to create sequences for {symbol}")
+                continue
             
-            logger.info(f"Created {len(sequences)} sequences from {len(self.symbols)} symbols")
-            logger.info(f"Train dataset size: {len(self.train_data)}, Val dataset size: {len(self.val_data)}")
+            sequences.append(windows)
+            targets.append(target)
             
-        except Exception as e:
-            logger.error(f"Error preparing data: {str(e)}")
-            raise
+            logger.info(f"Created {len(windows)} sequences for {symbol}")
+        
+        if not sequences:
+            raise ValueError(f"No sequences could be created. Check the logs for details.")
+        
+        # Allocate the final float32 buffers once and copy each symbol's train
+        # and val windows straight into their slices
+        total = sum(len(w) for w in sequences)
+        train_counts = [int(0.8 * len(w)) for w in sequences]
+        train_size = sum(train_counts)
+        n_features = sequences[0].shape[2]
+        X_np = np.empty((total, self.sequence_length, n_features), dtype=np.float32)
+        y_np = np.empty((total, 1), dtype=np.float32)
+        train_offset, val_offset = 0, train_size
+        for windows, target, n_train in zip(sequences, targets, train_counts):
+            n_val = len(windows) - n_train
+            X_np[train_offset:train_offset + n_train] = windows[:n_train]
+            y_np[train_offset:train_offset + n_train, 0] = target[:n_train]
+            X_np[val_offset:val_offset + n_val] = windows[n_train:]
+            y_np[val_offset:val_offset + n_val, 0] = target[n_train:]
+            train_offset += n_train
+            val_offset += n_val
+        
+        X = torch.from_numpy(X_np)
+        y = torch.from_numpy(y_np)
+        
+        logger.info(f"Final tensor shapes - X: {X.shape}, y: {y.shape}")
+        return X, y, train_size
+        
+    async def _create_features_parallel(self, market_data: pd.DataFrame) -> pd.DataFrame:
+        """Engineer features for each symbol in its own worker process"""
+        frames = [group for _, group in market_data.groupby('symbol', sort=False, observed=True)]
+        if len(frames) <= 1:
+            return self.feature_engineer.create_features({'market_data': market_data})
+        
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=min(len(frames), os.cpu_count() or 1)) as executor:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(
+                    executor, self.feature_engineer.create_features_single_symbol, {'market_data': frame}
+                )
+                for frame in frames
+            ))
+        
+        # Scalers are fitted in the workers, so bring them back to this process
+        for df, scaler in results:
+            self.feature_engineer.scalers[df['symbol'].iloc[0]] = scaler
+        return pd.concat([df for df, _ in results])
+        
+    def _current_bar(self) -> Optional[int]:
+        """Index of the current (not yet closed) bar, or None for calendar timeframes"""
+        interval_ms = self.data_collector._interval_ms()
+        if not interval_ms:
+            return None
+        return int(time.time() * 1000) // interval_ms
+        
+    def _cache_path(self) -> str:
+        """Sequence cache file for the current config; the bar it was built in is stored inside"""
+        # Anything that changes the stored tensors is part of the key: the data
+        # config, the storage dtype and the feature definitions
+        parts = [
+            ','.join(self.symbols), self.timeframe, str(self.sequence_length), str(self.prediction_horizon),
+            str(self.storage_dtype), str(FEATURE_SCHEMA_VERSION),
+            json.dumps(self.feature_engineer.config, sort_keys=True, default=str),
+        ]
+        key = hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+        return os.path.join(CACHE_DIR, f"sequences_{key}.pt")
+        
+    def _symbol_arrays(self, features: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Split features into time-ordered float32 arrays per symbol with one sort and one groupby"""
+        feature_columns = [c for c in features.columns if c not in ('symbol', 'timestamp')]  # Keeps price first
+        
+        if POLARS_AVAILABLE:
+            # Sort and group in polars' multi-threaded engine
+            frame = polars.from_pandas(features).sort(['symbol', 'timestamp'])
+            return {
+                symbol: group.select(feature_columns).to_numpy().astype(np.float32, copy=False)
+                for (symbol,), group in frame.group_by(['symbol'], maintain_order=True)
+            }
             
+        features = features.sort_values(['symbol', 'timestamp'], kind='stable')
+        return {
+            symbol: group[feature_columns].to_numpy(dtype=np.float32)
+            for symbol, group in features.groupby('symbol', sort=False, observed=True)
+        }
+        
+    def _create_sequences(self, feature_array: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Build (num_windows, seq_len, n_features) windows and their targets as zero-copy views"""
+        seq_count = len(feature_array) - self.sequence_length - self.prediction_horizon + 1
+        if seq_count <= 0:
+            return feature_array[:0, None], feature_array[:0, 0]
+        
+        windows = sliding_window_view(feature_array, self.sequence_length, axis=0)[:seq_count]
+        target_start = self.sequence_length + self.prediction_horizon - 1
+        targets = feature_array[target_start:target_start + seq_count, 0]  # Price is first column
+        assert len(targets) == len(windows), "targets must align one-to-one with windows"
+        return windows.transpose(0, 2, 1), targets
+        
     async def get_latest_data(self) -> torch.Tensor:
         """Get latest market data for prediction"""
         try:
-            # Collect latest data
+            # Collect latest data; only candles newer than the stored history are fetched
             latest_market_data = await self.data_collector.collect_data()
             
-            # Engineer features
-            features = self.feature_engineer.create_features({
-                'market_data': latest_market_data
-            })
+            last_ts = latest_market_data.groupby('symbol', sort=False, observed=True)['timestamp'].max()
+            stale = [s for s, ts in last_ts.items() if self._last_ts.get(s) != ts]
+            
+            # Recompute features only for symbols that have a new candle. They are
+            # built over the same full history as in training: path-dependent
+            # features like obv (a running sum) depend on where the history starts
+            if stale:
+                features = self.feature_engineer.create_features({
+                    'market_data': latest_market_data[latest_market_data['symbol'].isin(stale)]
+                })
+                for symbol, feature_array in self._symbol_arrays(features).items():
+                    if len(feature_array) >= self.sequence_length:
+                        self._latest_features[symbol] = feature_array[-self.sequence_length:].copy()
+                        self._last_ts[symbol] = last_ts[symbol]
+                    else:
+                        logger.warning(f"Not enough data for a full sequence for {symbol}")
             
             # Create sequences for each symbol
             sequences = []
             for symbol in self.symbols:
-                symbol_mask = features['symbol'] == symbol
-                symbol_features = features[symbol_mask].sort_values('timestamp')
-                
-                if symbol_features.empty:
+                x = self._latest_features.get(symbol)
+                if x is None:
                     logger.warning(f"No data found for symbol {symbol}")
                     continue
-                
-                # Convert to numpy for faster processing
-                feature_array = symbol_features.drop(['symbol', 'timestamp'], axis=1).values
-                
-                # Take the latest sequence
-                if len(feature_array) >= self.sequence_length:
-                    x = feature_array[-self.sequence_length:]
-                    sequences.append(x)
-                else:
-                    logger.warning(f"Not enough data for a full sequence for {symbol}")
+                sequences.append(x)
                     
             if not sequences:
                 raise ValueError("No sequences could be created from latest data")
                 
-            # Convert to tensor and reshape for transformer (batch_size, seq_len, input_dim)
-            X = torch.tensor(sequences, dtype=torch.float32)
+            # Stack into one contiguous (batch_size, seq_len, input_dim) buffer and
+            # wrap it without another copy
+            X = torch.from_numpy(np.stack(sequences))
             return X  # Shape: (num_symbols, seq_len, input_dim)
             
         except Exception as e:
@@ -160,14 +293,24 @@ class CryptoDataModule(pl.LightningDataModule):
         """Setup data for training/validation"""
         pass  # Data is already prepared in prepare_data
         
+    def _loader_kwargs(self) -> Dict:
+        """Worker/pinning options shared by the train and val loaders"""
+        # Pinned batches let Lightning's device transfer use non_blocking copies
+        kwargs = {'num_workers': self.num_workers, 'pin_memory': True}
+        if self.num_workers > 0:
+            # Only valid with worker processes; num_workers=0 loads in the main process
+            kwargs['persistent_workers'] = True
+            kwargs['prefetch_factor'] = self.prefetch_factor
+        return kwargs
+        
     def train_dataloader(self):
         """Get training data loader"""
         return DataLoader(
             self.train_data,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=4,
-            pin_memory=True
+            drop_last=True,  # Fixed batch shape keeps compiled graphs from recompiling
+            **self._loader_kwargs()
         )
         
     def val_dataloader(self):
@@ -176,6 +319,5 @@ class CryptoDataModule(pl.LightningDataModule):
             self.val_data,
             batch_size=self.batch_size,
             shuffle=False,
-            num_workers=4,
-            pin_memory=True
+            **self._loader_kwargs()
         )
@@ -57,8 +57,8 @@ class BaseDataCollector(ABC):
             logger.error(f"Missing required columns: {required_columns}")
             return False
             
-        # Check for missing values
-        if df.isnull().any().any():
+        # Check for missing values with a single pass over the null mask
+        if df.isna().to_numpy().any():
             logger.warning("Missing values detected in data")
             return False
             
@@ -74,19 +74,26 @@ class BaseDataCollector(ABC):
         Returns:
             pd.DataFrame: Preprocessed DataFrame
         """
-        # Handle missing values
-        df = df.ffill().bfill()
+        # Handle missing values; build the null mask once and skip the fills when
+        # there is nothing to fill. After ffill only leading gaps remain, so bfill
+        # is needed only if some column starts with a null.
+        null_mask = df.isna().to_numpy()
+        if null_mask.any():
+            df = df.ffill()
+            if null_mask[0].any():
+                df = df.bfill()
         
         # Convert timestamps
         if 'timestamp' in df.columns:
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             
-        # Remove duplicates
-        df = df.drop_duplicates()
+        # Remove duplicates, keyed on (timestamp, symbol) when both exist
+        key_columns = [c for c in ('timestamp', 'symbol') if c in df.columns]
+        df = df.drop_duplicates(subset=key_columns if len(key_columns) == 2 else None)
         
-        # Sort by timestamp if available
+        # Sort by timestamp if available (stable, so per-symbol order is preserved)
         if 'timestamp' in df.columns:
-            df = df.sort_values('timestamp')
+            df = df.sort_values('timestamp', kind='mergesort')
             
         return df
     
@@ -1,21 +1,95 @@
+"""Binance and Ethereum data collection.
+
+The collector holds network resources once it has been used, so prefer
+``async with CryptoDataCollector(symbols) as collector: ...`` or await
+``collector.aclose()`` when done; an unclosed collector only logs a warning
+when it is garbage collected.
+"""
 import os
 import logging
 import asyncio
 import aiohttp
 import hmac
+import json
 import hashlib
 import time
-from typing import Dict, Any, List
+import random
+import weakref
+from functools import cached_property
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlencode
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from web3 import Web3
+from web3 import AsyncWeb3
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Kline history is persisted here per (symbol, timeframe) so cold starts fetch only new candles
+CACHE_DIR = ".cache"
+# Most rows Binance returns from one /klines request; larger limits are clamped to this
+KLINES_PAGE_SIZE = 1000
+# Candles of history kept per symbol, fetched as several pages when needed
+KLINES_HISTORY = 2000
+# Seconds a Binance endpoint is skipped after it fails
+ENDPOINT_COOLDOWN = 60.0
+# Concurrent Binance requests, to stay inside the per-IP request weight limit
+MAX_CONCURRENT_REQUESTS = 8
+KLINE_NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'quote_volume',
+                         'trades', 'taker_buy_volume', 'taker_buy_quote_volume']
+# Positions of those columns in a raw Binance kline row (skipping close_time and ignore)
+KLINE_NUMERIC_INDICES = [1, 2, 3, 4, 5, 7, 8, 9, 10]
+# Decoder for Binance and JSON-RPC payloads; klines pages are large
+JSON_LOADS = orjson.loads if ORJSON_AVAILABLE else json.loads
+ONCHAIN_COLUMNS = ['gas_used', 'gas_limit', 'transaction_count', 'base_fee']
+# Post-merge Ethereum slot time, used to pick one block near each bar when sampling history
+ETH_BLOCK_SECONDS = 12
+# Blocks per JSON-RPC batch, inside common node provider limits
+ONCHAIN_BATCH_SIZE = 500
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def bucket_mean(ts, vals, bucket_ns):
+        """NaN-skipping per-bucket column means over a dense grid of fixed-width buckets."""
+        first = ts[0] // bucket_ns
+        n_buckets = ts[-1] // bucket_ns - first + 1
+        n_cols = vals.shape[1]
+        sums = np.zeros((n_buckets, n_cols))
+        counts = np.zeros((n_buckets, n_cols), dtype=np.int64)
+        for i in range(ts.shape[0]):
+            b = ts[i] // bucket_ns - first
+            for j in range(n_cols):
+                v = vals[i, j]
+                if not np.isnan(v):
+                    sums[b, j] += v
+                    counts[b, j] += 1
+        
+        means = np.empty((n_buckets, n_cols))
+        for b in range(n_buckets):
+            for j in range(n_cols):
+                means[b, j] = sums[b, j] / counts[b, j] if counts[b, j] > 0 else np.nan
+        bucket_ts = (np.arange(n_buckets) + first) * bucket_ns
+        return bucket_ts, means
+
+def _warn_unclosed(state: Dict[str, bool]) -> None:
+    if state['opened']:
+        logger.warning("CryptoDataCollector was not closed; use 'async with' or await aclose()")
+
 class CryptoDataCollector:
     """Collects cryptocurrency data from various sources"""
     
@@ -31,17 +105,83 @@ class CryptoDataCollector:
         self.timeframe = self._convert_timeframe(timeframe)
         self.api_key = os.getenv('BINANCE_API_KEY')
         self.api_secret = os.getenv('BINANCE_API_SECRET')
+        self._hmac_template = (
+            hmac.new(self.api_secret.encode('utf-8'), b'', hashlib.sha256)
+            if self.api_secret else None
+        )
         self.base_urls = [
             'https://api.binance.com',
             'https://api1.binance.com',
             'https://api2.binance.com',
             'https://api3.binance.com'
         ]
+        # Start from the last endpoint that answered; failing ones sit out a cooldown
+        self._preferred_base_url_idx = 0
+        self._endpoint_cooldown_until = [0.0] * len(self.base_urls)
+        
+        # Static klines query per symbol, built once
+        self._klines_params = {
+            s: {'symbol': s, 'interval': self.timeframe, 'limit': KLINES_PAGE_SIZE}
+            for s in self.symbols
+        }
+        
+        # Rolling kline history per symbol; new fetches start from the last candle
+        self._history: Dict[str, pd.DataFrame] = {}
+        self._request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        # Last klines frame per (symbol, interval) and when the bar it was fetched in closes
+        self._kline_cache: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+        self._kline_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # One pooled session for all Binance calls, created on first use
+        self._session: Optional[aiohttp.ClientSession] = None
         
-        # Initialize Web3
-        self.w3 = Web3(Web3.HTTPProvider(
-            f"https://eth-mainnet.g.alchemy.com/v2/{os.getenv('ALCHEMY_API_KEY')}"
-        ))
+        # Ethereum node for the JSON-RPC batches sent over the shared session
+        self.rpc_url = f"https://eth-mainnet.g.alchemy.com/v2/{os.getenv('ALCHEMY_API_KEY')}"
+        
+        # The finalizer only warns; closing is always explicit via aclose()
+        self._resource_state = {'opened': False}
+        self._finalizer = weakref.finalize(self, _warn_unclosed, self._resource_state)
+        
+    @cached_property
+    def w3(self) -> AsyncWeb3:
+        """Web3 client for callers that need more than the raw block batches, built on first access"""
+        return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(self.rpc_url))
+        
+    async def __aenter__(self) -> 'CryptoDataCollector':
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+        
+    async def aclose(self) -> None:
+        """Release network resources held by the collector"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if 'w3' in self.__dict__:
+            # AsyncHTTPProvider only exposes disconnect() on newer web3 releases
+            disconnect = getattr(self.w3.provider, 'disconnect', None)
+            if disconnect is not None:
+                await disconnect()
+            del self.w3
+        self._resource_state['opened'] = False
+        self._finalizer.detach()
+        
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            # No global cap, so the four Binance hosts and the RPC node each get
+            # their own pool; DNS answers and idle keep-alive sockets are reused
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0,
+                    limit_per_host=8,
+                    use_dns_cache=True,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=75
+                )
+            )
+            self._resource_state['opened'] = True
+        return self._session
         
     def _convert_timeframe(self, timeframe: str) -> str:
         """Convert CCXT timeframe to Binance format"""
@@ -55,130 +195,345 @@ class CryptoDataCollector:
         
     def _get_signature(self, params: Dict[str, Any]) -> str:
         """Generate signature for authenticated endpoints"""
-        query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
-        return hmac.new(
-            self.api_secret.encode('utf-8'),
-            query_string.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-    async def _make_request(self, session: aiohttp.ClientSession, endpoint: str, 
-                          params: Dict[str, Any] = None, signed: bool = False) -> Dict:
-        """Make request to Binance API with fallback to alternative endpoints"""
-        if params is None:
-            params = {}
-            
-        if signed:
-            params['timestamp'] = int(time.time() * 1000)
-            params['signature'] = self._get_signature(params)
-            
-        headers = {'X-MBX-APIKEY': self.api_key} if signed else {}
-        
-        # Try each base URL in sequence
+        h = self._hmac_template.copy()  # Already keyed, so no per-request key schedule
+        h.update(urlencode(params).encode('utf-8'))
+        return h.hexdigest()
+        
+    def _endpoint_order(self) -> List[int]:
+        """Base URL indices starting at the preferred one, skipping endpoints in cooldown"""
+        n = len(self.base_urls)
+        order = [(self._preferred_base_url_idx + i) % n for i in range(n)]
+        now = time.time()
+        healthy = [i for i in order if self._endpoint_cooldown_until[i] <= now]
+        return healthy or order  # If every endpoint is cooling down, try them all anyway
+        
+    async def _make_request(self, endpoint: str, params: Dict[str, Any] = None, signed: bool = False,
+                            max_retries: int = 3, base: float = 1.0, cap: float = 30.0) -> Dict:
+        """Make request to Binance API, failing over across endpoints and backing off between rounds
+        
+        Timeouts, connection errors, 5xx and 429 responses are retried; any other
+        4xx is raised immediately since retrying cannot fix it.
+        """
+        params = dict(params or {})
+        session = await self._get_session()
+        
         last_error = None
-        for base_url in self.base_urls:
-            url = f"{base_url}{endpoint}"
-            try:
-                async with session.get(url, params=params, headers=headers, timeout=10) as response:
-                    if response.status == 429:  # Rate limit
-                        retry_after = int(response.headers.get('Retry-After', 5))
-                        await asyncio.sleep(retry_after)
-                        continue
-                        
-                    response.raise_for_status()
-                    return await response.json()
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                last_error = e
-                logger.warning(f"Failed to connect to {base_url}: {str(e)}")
-                continue
+        for attempt in range(max_retries):
+            if signed:
+                # Re-sign each round so the timestamp stays inside recvWindow
+                params.pop('signature', None)
+                params['timestamp'] = int(time.time() * 1000)
+                params['signature'] = self._get_signature(params)
+            headers = {'X-MBX-APIKEY': self.api_key} if signed else {}
+            
+            retry_after = 0.0
+            for idx in self._endpoint_order():
+                base_url = self.base_urls[idx]
+                url = f"{base_url}{endpoint}"
+                try:
+                    async with session.get(url, params=params, headers=headers, timeout=10) as response:
+                        if response.status == 429:  # Rate limit is per IP, so stop failing over
+                            retry_after = float(response.headers.get('Retry-After', 0))
+                            last_error = aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=429, message="Rate limited"
+                            )
+                            break
+                            
+                        response.raise_for_status()
+                        data = await response.json(loads=JSON_LOADS)
+                        self._preferred_base_url_idx = idx
+                        return data
+                except aiohttp.ClientResponseError as e:
+                    if e.status < 500:
+                        raise
+                    last_error = e
+                    self._endpoint_cooldown_until[idx] = time.time() + ENDPOINT_COOLDOWN
+                    logger.warning(f"Server error from {base_url}: {str(e)}")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    last_error = e
+                    self._endpoint_cooldown_until[idx] = time.time() + ENDPOINT_COOLDOWN
+                    logger.warning(f"Failed to connect to {base_url}: {str(e)}")
+                    
+            if attempt < max_retries - 1:
+                # Jitter keeps concurrent symbol fetches from retrying in lockstep
+                delay = min(cap, max(retry_after, base * 2 ** attempt * (1 + random.random() * 0.5)))
+                await asyncio.sleep(delay)
                 
-        # If we get here, all endpoints failed
+        # If we get here, all endpoints failed on every attempt
         logger.error(f"All Binance API endpoints failed: {str(last_error)}")
         raise last_error
             
-    async def collect_data(self) -> pd.DataFrame:
-        """Collect market data from Binance"""
+    @staticmethod
+    def _shrink_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast numeric columns to the smallest lossless dtype and store symbols as categories"""
+        # Columns already at their target dtype are left alone, so a second pass
+        # (collect_all_data over collect_data's output) copies nothing
+        for col in df.columns:
+            dtype = df[col].dtype
+            if col == 'trades':
+                if dtype != np.uint32:
+                    df[col] = df[col].astype(np.uint32)  # Trade counts are whole numbers
+            elif pd.api.types.is_float_dtype(dtype):
+                if dtype != np.float32:
+                    df[col] = pd.to_numeric(df[col], downcast='float')
+            elif pd.api.types.is_integer_dtype(dtype):
+                if dtype.itemsize > 1:
+                    df[col] = pd.to_numeric(df[col], downcast='integer')
+        if 'symbol' in df.columns and not isinstance(df['symbol'].dtype, pd.CategoricalDtype):
+            df['symbol'] = df['symbol'].astype('category')
+        return df
+        
+    def _interval_ms(self) -> Optional[int]:
+        """Length of one candle in milliseconds (None for calendar intervals like 1M)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                all_data = []
+            return int(pd.Timedelta(self.timeframe).total_seconds() * 1000)
+        except ValueError:
+            return None
+            
+    def _history_path(self, symbol: str) -> str:
+        return os.path.join(CACHE_DIR, f"klines_{symbol}_{self.timeframe}.parquet")
+        
+    def _load_history(self, symbol: str) -> Optional[pd.DataFrame]:
+        """Load persisted kline history for a symbol, if any"""
+        path = self._history_path(symbol)
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        return None
+        
+    async def _fetch_symbol(self, symbol: str) -> pd.DataFrame:
+        """Fetch klines for one symbol, reusing the last result until the current bar closes"""
+        key = (symbol, self.timeframe)
+        # One fetch per key at a time; concurrent callers wait and then hit the cache
+        async with self._kline_locks.setdefault(key, asyncio.Lock()):
+            cached = self._kline_cache.get(key)
+            if cached is not None and time.time() < cached[0]:
+                return cached[1]
                 
-                # Get klines data for each symbol
-                for symbol in self.symbols:
-                    endpoint = '/api/v3/klines'
-                    params = {
-                        'symbol': symbol,
-                        'interval': self.timeframe,
-                        'limit': 2000  # Maximum allowed by Binance
-                    }
-                    
-                    data = await self._make_request(session, endpoint, params)
-                    
-                    # Convert to DataFrame
-                    df = pd.DataFrame(data, columns=[
-                        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                        'close_time', 'quote_volume', 'trades', 'taker_buy_volume',
-                        'taker_buy_quote_volume', 'ignore'
-                    ])
-                    
-                    # Clean up data
-                    df = df.drop(['close_time', 'ignore'], axis=1)
-                    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                    df['symbol'] = symbol.replace('USDT', '/USDT')  # Convert back to BTC/USDT format
-                    
-                    # Convert string columns to float
-                    for col in ['open', 'high', 'low', 'close', 'volume', 'quote_volume',
-                              'trades', 'taker_buy_volume', 'taker_buy_quote_volume']:
-                        df[col] = df[col].astype(float)
-                    
-                    all_data.append(df)
+            df = await self._fetch_klines(symbol)
+            interval_ms = self._interval_ms()
+            if interval_ms:
+                next_bar_ms = (int(time.time() * 1000) // interval_ms + 1) * interval_ms
+                self._kline_cache[key] = (next_bar_ms / 1000, df)
+            return df
+            
+    async def _fetch_kline_pages(self, params: Dict[str, Any], start_ms: int, interval_ms: int) -> List[list]:
+        """Page forward through /klines from start_ms until a short page or the current bar"""
+        now_ms = int(time.time() * 1000)
+        pages = []
+        while True:
+            async with self._request_semaphore:
+                page = await self._make_request('/api/v3/klines', {**params, 'startTime': start_ms})
+            if page:
+                pages.append(page)
+            if len(page) < KLINES_PAGE_SIZE:
+                break
+            start_ms = page[-1][0] + interval_ms
+            if start_ms > now_ms:
+                break
+        return pages
+        
+    async def _fetch_klines(self, symbol: str) -> pd.DataFrame:
+        """Fetch klines for one symbol and convert them to a DataFrame"""
+        params = self._klines_params[symbol]
+        
+        history = self._history.get(symbol)
+        if history is None:
+            history = self._load_history(symbol)
+            
+        # Only ask for candles from the last known one onward. That candle is
+        # refetched because it may still have been open. Without recent enough
+        # history, start KLINES_HISTORY bars back instead
+        interval_ms = self._interval_ms()
+        if interval_ms:
+            now_ms = int(time.time() * 1000)
+            last_ts = None
+            if history is not None and not history.empty:
+                last_ts = history['timestamp'].iloc[-1].value // 1_000_000
+            if last_ts is not None and now_ms - last_ts < KLINES_HISTORY * interval_ms:
+                start_ms = last_ts
+            else:
+                history = None
+                start_ms = (now_ms // interval_ms - KLINES_HISTORY + 1) * interval_ms
+            pages = await self._fetch_kline_pages(params, start_ms, interval_ms)
+        else:
+            # Calendar intervals have no fixed bar length to page by; take the latest page
+            history = None
+            async with self._request_semaphore:
+                pages = [await self._make_request('/api/v3/klines', params)]
+        data = [row for page in pages for row in page]
+        
+        # Parse the string matrix with one cast for all numeric columns instead
+        # of an object DataFrame and a per-column astype
+        arr = np.array(data, dtype=object).reshape(-1, 12)
+        timestamps = arr[:, 0].astype(np.int64)
+        numeric = arr[:, KLINE_NUMERIC_INDICES].astype(np.float64)
+        
+        df = pd.DataFrame({
+            'timestamp': (timestamps * 1_000_000).view('datetime64[ns]'),  # ms -> ns, no parsing
+            **{col: numeric[:, i] for i, col in enumerate(KLINE_NUMERIC_COLUMNS)},
+            'symbol': symbol.replace('USDT', '/USDT')  # Convert back to BTC/USDT format
+        })
+        
+        if history is not None:
+            if df.empty:
+                df = history
+            else:
+                df = pd.concat(
+                    [history[history['timestamp'] < df['timestamp'].iloc[0]], df],
+                    ignore_index=True
+                )
+        df = df.iloc[-KLINES_HISTORY:].reset_index(drop=True)
                 
-                # Combine all symbols' data
-                combined_df = pd.concat(all_data, ignore_index=True)
+        self._history[symbol] = df
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(self._history_path(symbol))
+        return df
+        
+    async def collect_data(self) -> pd.DataFrame:
+        """Collect market data from Binance"""
+        try:
+            # Fetch all symbols concurrently; total latency is the slowest request
+            results = await asyncio.gather(
+                *(self._fetch_symbol(symbol) for symbol in self.symbols),
+                return_exceptions=True
+            )
+            
+            all_data = []
+            for symbol, result in zip(self.symbols, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Error fetching klines for {symbol}: {str(result)}")
+                    continue
+                all_data.append(result)
                 
-                logger.info(f"Collected {len(combined_df)} data points")
-                return combined_df
+            if not all_data:
+                raise next(r for r in results if isinstance(r, Exception))
+            
+            # Combine all symbols' data into buffers sized once up front. The
+            # numeric buffer is column-major so every column the frame wraps is
+            # one contiguous run for the column-wise work downstream
+            total = sum(len(df) for df in all_data)
+            values = np.empty((total, len(KLINE_NUMERIC_COLUMNS)), dtype=np.float64, order='F')
+            timestamps = np.empty(total, dtype='datetime64[ns]')
+            symbols = np.empty(total, dtype=object)
+            offset = 0
+            for df in all_data:
+                n = len(df)
+                values[offset:offset + n] = df[KLINE_NUMERIC_COLUMNS].to_numpy()
+                timestamps[offset:offset + n] = df['timestamp'].to_numpy()
+                symbols[offset:offset + n] = df['symbol'].to_numpy()
+                offset += n
                 
+            combined_df = pd.DataFrame(values, columns=KLINE_NUMERIC_COLUMNS, copy=False)
+            combined_df.insert(0, 'timestamp', timestamps)
+            combined_df['symbol'] = symbols
+            combined_df = self._shrink_dtypes(combined_df)
+            
+            logger.info(f"Collected {len(combined_df)} data points")
+            return combined_df
+            
         except Exception as e:
             logger.error(f"Error collecting market data: {str(e)}")
             raise
 
-    async def fetch_onchain_data(self) -> pd.DataFrame:
-        """Fetch on-chain metrics from Ethereum"""
+    async def _rpc(self, payload: Any) -> Any:
+        """POST a JSON-RPC request (or batch) to the Ethereum node"""
+        session = await self._get_session()
+        async with session.post(self.rpc_url, json=payload, timeout=10) as response:
+            response.raise_for_status()
+            return await response.json(loads=JSON_LOADS)
+            
+    async def _fetch_blocks_batched(self, numbers: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch block headers in a single JSON-RPC batch; failed blocks come back as None"""
+        responses = await self._rpc([
+            {'jsonrpc': '2.0', 'id': n, 'method': 'eth_getBlockByNumber', 'params': [hex(n), False]}
+            for n in numbers
+        ])
+        
+        # Batch responses may arrive in any order
+        by_id = {r.get('id'): r for r in responses}
+        blocks = []
+        for n in numbers:
+            response = by_id.get(n, {})
+            if response.get('result') is None:
+                logger.warning(f"Error fetching block {n}: {response.get('error')}")
+                blocks.append(None)
+            else:
+                blocks.append(response['result'])
+        return blocks
+        
+    async def fetch_onchain_data(self, bars: Optional[int] = None) -> pd.DataFrame:
+        """Fetch on-chain metrics from Ethereum
+        
+        Args:
+            bars: Cover this many bars of history by sampling about one block per
+                bar. By default only the last 100 blocks are fetched.
+        """
         try:
             # Get latest block
-            latest_block = self.w3.eth.block_number
+            response = await self._rpc(
+                {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []}
+            )
+            latest_block = int(response['result'], 16)
             
-            # Initialize data storage
-            blocks_data = []
+            interval_ms = self._interval_ms()
+            if bars and interval_ms:
+                blocks_per_bar = max(1, interval_ms // (ETH_BLOCK_SECONDS * 1000))
+                first_block = max(latest_block - bars * blocks_per_bar, 0)
+                block_numbers = list(range(latest_block, first_block - 1, -blocks_per_bar))[::-1]
+            else:
+                block_numbers = list(range(latest_block - 100, latest_block + 1))
             
-            # Collect data for last 100 blocks
-            for block_number in range(latest_block - 100, latest_block + 1):
-                try:
-                    block = self.w3.eth.get_block(block_number)
-                    
-                    block_data = {
-                        'timestamp': datetime.fromtimestamp(block['timestamp']),
-                        'gas_used': block['gasUsed'],
-                        'gas_limit': block['gasLimit'],
-                        'transaction_count': len(block['transactions']),
-                        'base_fee': block['baseFeePerGas'] if 'baseFeePerGas' in block else None
-                    }
-                    
-                    blocks_data.append(block_data)
-                    
-                except Exception as e:
-                    logger.warning(f"Error fetching block {block_number}: {str(e)}")
+            # Batched requests instead of one round-trip per block, with the
+            # batches themselves in flight together
+            batches = await asyncio.gather(*(
+                self._fetch_blocks_batched(block_numbers[i:i + ONCHAIN_BATCH_SIZE])
+                for i in range(0, len(block_numbers), ONCHAIN_BATCH_SIZE)
+            ))
+            blocks = [block for batch in batches for block in batch]
+            
+            # Fill preallocated arrays by index rather than building a dict per
+            # block. Metrics go straight into the float64 matrix the bucketing
+            # consumes, one column per ONCHAIN_COLUMNS entry
+            n = len(blocks)
+            timestamps = np.empty(n, dtype=np.int64)
+            values = np.empty((n, len(ONCHAIN_COLUMNS)), dtype=np.float64)
+            values[:, 3] = np.nan  # base_fee is absent before London
+            
+            k = 0
+            for block in blocks:
+                if block is None:
                     continue
+                    
+                # Raw JSON-RPC quantities are hex strings
+                timestamps[k] = int(block['timestamp'], 16)
+                values[k, 0] = int(block['gasUsed'], 16)
+                values[k, 1] = int(block['gasLimit'], 16)
+                values[k, 2] = len(block['transactions'])
+                if 'baseFeePerGas' in block:
+                    values[k, 3] = int(block['baseFeePerGas'], 16)
+                k += 1
                 
-            if not blocks_data:
+            if k == 0:
                 raise ValueError("No on-chain data collected")
                 
-            # Convert to DataFrame
-            onchain_df = pd.DataFrame(blocks_data)
-            onchain_df.set_index('timestamp', inplace=True)
+            # Blocks arrive in height order, so timestamps are already ascending
+            ts_ns = timestamps[:k] * 1_000_000_000
+            values = values[:k]
             
-            # Resample to match market data timeframe
-            onchain_df = onchain_df.resample(self.timeframe).mean()
+            # Bucket to the market data timeframe in one pass (UTC, like the kline timestamps)
+            if NUMBA_AVAILABLE and interval_ms:
+                bucket_ts, means = bucket_mean(ts_ns, values, interval_ms * 1_000_000)
+                onchain_df = pd.DataFrame(
+                    means,
+                    columns=ONCHAIN_COLUMNS,
+                    index=pd.DatetimeIndex(bucket_ts.view('datetime64[ns]'), name='timestamp')
+                )
+            else:
+                onchain_df = pd.DataFrame(
+                    values,
+                    columns=ONCHAIN_COLUMNS,
+                    index=pd.DatetimeIndex(ts_ns.view('datetime64[ns]'), name='timestamp')
+                ).resample(self.timeframe).mean()
             
             return onchain_df
             
@@ -186,22 +541,40 @@ class CryptoDataCollector:
             logger.error(f"Error fetching on-chain data: {str(e)}")
             raise
 
+    @staticmethod
+    def _align_onchain(market_data: pd.DataFrame, onchain_data: pd.DataFrame) -> pd.DataFrame:
+        """Join on-chain buckets onto the candles without letting any candle see later on-chain data"""
+        if not onchain_data.index.is_monotonic_increasing:
+            onchain_data = onchain_data.sort_index()
+        # On-chain buckets start on the same UTC bar boundaries as the klines.
+        # Bars without a sampled block carry the last known values forward,
+        # never backward, so no candle sees later on-chain data
+        candle_ts = pd.DatetimeIndex(np.sort(market_data['timestamp'].unique()))
+        onchain_data = onchain_data.reindex(onchain_data.index.union(candle_ts)).ffill().reindex(candle_ts)
+        onchain_data.index.name = 'timestamp'
+        combined_data = market_data.join(onchain_data, on='timestamp', how='left')
+        # Candles before the first sample have nothing earlier to fill from;
+        # drop them rather than leave NaNs for feature engineering to backfill
+        return combined_data[combined_data['gas_used'].notna()].reset_index(drop=True)
+        
     async def collect_all_data(self) -> pd.DataFrame:
         """Collect all types of data and combine them"""
         try:
+            # On-chain history is sampled over exactly the bars the klines span,
+            # so the klines come first
             market_data = await self.collect_data()
-            onchain_data = await self.fetch_onchain_data()
+            bars = None
+            interval_ms = self._interval_ms()
+            if not market_data.empty and interval_ms:
+                first_ms = market_data['timestamp'].min().value // 1_000_000
+                bars = int(time.time() * 1000 - first_ms) // interval_ms + 1
+            onchain_data = await self.fetch_onchain_data(bars=bars)
             
             if not market_data.empty and not onchain_data.empty:
-                combined_data = pd.merge(
-                    market_data,
-                    onchain_data,
-                    left_index=True,
-                    right_index=True,
-                    how='left'
-                )
+                combined_data = self._align_onchain(market_data, onchain_data)
             else:
                 combined_data = market_data
+            combined_data = self._shrink_dtypes(combined_data)
                 
             logger.info(f"Collected {len(combined_data)} data points")
             return combined_data
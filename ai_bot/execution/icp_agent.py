@@ -0,0 +1,136 @@
+import os
+import json
+from typing import Dict, Any, Optional
+from ic.agent import Agent
+from ic.client import Client
+from ic.identity import Identity
+from ic.candid import encode, Types
+
+MAINNET_URL = "https://ic0.app"
+LOCAL_URL = "http://127.0.0.1:8000"  # bind address from motoko_contracts/dfx.json
+# Where dfx keeps identity.json (the selected identity) and <name>/identity.pem
+DFX_CONFIG_DIR = os.path.expanduser("~/.config/dfx")
+
+# Candid shape of the backend's Portfolio record, declared once so results
+# decode straight into a dict keyed by field name
+PORTFOLIO_TYPE = Types.Record({
+    'btc': Types.Float64,
+    'eth': Types.Float64,
+    'ckbtc': Types.Float64,
+    'cketh': Types.Float64,
+    'lastRebalanceTime': Types.Int,
+    'totalValue': Types.Float64,
+    'performance': Types.Float64,
+    'btcAddress': Types.Opt(Types.Text),
+    'ethAddress': Types.Opt(Types.Text),
+})
+
+def load_dfx_identity(name: Optional[str] = None, pem_path: Optional[str] = None) -> Identity:
+    """Load a dfx identity's PEM so calls are signed by the same principal dfx would use.
+
+    Defaults to the identity selected with ``dfx identity use``. Identities kept in
+    the OS keyring or password-protected have no plain PEM on disk; export one with
+    ``dfx identity export <name>`` and pass its path instead.
+    """
+    if pem_path is None:
+        if name is None:
+            selected_path = os.path.join(DFX_CONFIG_DIR, "identity.json")
+            name = "default"
+            if os.path.exists(selected_path):
+                with open(selected_path) as f:
+                    name = json.load(f).get("default", name)
+        pem_path = os.path.join(DFX_CONFIG_DIR, "identity", name, "identity.pem")
+    if not os.path.isfile(pem_path):
+        raise FileNotFoundError(
+            f"dfx identity PEM not found at {pem_path}; refusing to call the canister "
+            f"as the anonymous principal"
+        )
+    with open(pem_path) as f:
+        return Identity.from_pem(f.read())
+
+class ICPCanisterClient:
+    """Calls the trading canister over HTTP with the ic-py agent instead of dfx"""
+
+    def __init__(self, canister_id: str, use_mainnet: bool = True,
+                 url: Optional[str] = None, identity: Optional[Identity] = None):
+        self.canister_id = canister_id
+        # Sign as dfx's selected identity unless told otherwise, never as anonymous
+        self.agent = Agent(
+            identity or load_dfx_identity(),
+            Client(url=url or (MAINNET_URL if use_mainnet else LOCAL_URL))
+        )
+
+    @staticmethod
+    def resolve_canister_id(project_dir: str, canister_name: str = "motoko_contracts_backend",
+                            use_mainnet: bool = True) -> str:
+        """Look up a canister id the same way dfx does for the given network."""
+        if use_mainnet:
+            ids_path = os.path.join(project_dir, "canister_ids.json")
+            network = "ic"
+        else:
+            ids_path = os.path.join(project_dir, ".dfx", "local", "canister_ids.json")
+            network = "local"
+        with open(ids_path) as f:
+            return json.load(f)[canister_name][network]
+
+    async def set_predictions(self, btc_pred: float, eth_pred: float) -> None:
+        """Store the latest BTC and ETH price predictions."""
+        await self.agent.update_raw_async(
+            self.canister_id, "setPredictions",
+            encode([
+                {'type': Types.Float64, 'value': float(btc_pred)},
+                {'type': Types.Float64, 'value': float(eth_pred)},
+            ])
+        )
+
+    async def rebalance(self) -> str:
+        """Trigger a rebalance and return the canister's status message."""
+        result = await self.agent.update_raw_async(
+            self.canister_id, "rebalance", encode([]), return_type=[Types.Text]
+        )
+        return result[0]['value']
+
+    async def update_metrics(self, sharpe_ratio: float, volatility: float,
+                             var_95: float, max_drawdown: float) -> None:
+        """Store the latest portfolio risk metrics."""
+        await self.agent.update_raw_async(
+            self.canister_id, "updateMetrics",
+            encode([
+                {'type': Types.Float64, 'value': float(sharpe_ratio)},
+                {'type': Types.Float64, 'value': float(volatility)},
+                {'type': Types.Float64, 'value': float(var_95)},
+                {'type': Types.Float64, 'value': float(max_drawdown)},
+            ])
+        )
+
+    async def set_and_rebalance(self, btc_pred: float, eth_pred: float) -> Dict[str, Any]:
+        """Store predictions, rebalance and return the new portfolio in one update call."""
+        result = await self.agent.update_raw_async(
+            self.canister_id, "setAndRebalance",
+            encode([
+                {'type': Types.Float64, 'value': float(btc_pred)},
+                {'type': Types.Float64, 'value': float(eth_pred)},
+            ]),
+            return_type=[PORTFOLIO_TYPE]
+        )
+        return result[0]['value']
+
+    async def execute_cycle(self, btc_pred: float, eth_pred: float, sharpe_ratio: float,
+                            volatility: float, var_95: float, max_drawdown: float) -> str:
+        """Store predictions and metrics, then rebalance, in one update call."""
+        result = await self.agent.update_raw_async(
+            self.canister_id, "executeCycle",
+            encode([
+                {'type': Types.Float64, 'value': float(v)}
+                for v in (btc_pred, eth_pred, sharpe_ratio, volatility, var_95, max_drawdown)
+            ]),
+            return_type=[Types.Text]
+        )
+        return result[0]['value']
+
+    async def get_portfolio(self) -> Dict[str, Any]:
+        """Fetch the current portfolio record."""
+        result = await self.agent.query_raw_async(
+            self.canister_id, "getPortfolio", encode([]), return_type=[PORTFOLIO_TYPE]
+        )
+        return result[0]['value']
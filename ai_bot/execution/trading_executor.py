@@ -1,24 +1,101 @@
 import asyncio
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import os
 import json
 import logging
 import torch
 import subprocess
+from pathlib import Path
 try:
     import wandb
     WANDB_AVAILABLE = True
 except ImportError:
     WANDB_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from .icp_agent import ICPCanisterClient, load_dfx_identity
+    IC_PY_AVAILABLE = True
+except ImportError:
+    IC_PY_AVAILABLE = False
+
 from ..strategies.portfolio_optimizer import ModernPortfolioOptimizer, PortfolioMetrics
 from ..models.transformer_model import CryptoTransformerLightning
 
 logger = logging.getLogger(__name__)
 
+JSON_LOADS = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+RISK_METRIC_NAMES = ('volatility', 'VaR', 'drawdown', 'Sharpe ratio')
+
+# dfx project holding canister_ids.json; dfx is run from here when ic-py is unavailable.
+# Resolved from this file so it doesn't depend on the working directory
+MOTOKO_PROJECT_DIR = str(Path(__file__).resolve().parents[2] / "motoko_contracts")
+
+class TradeHistoryBuffer:
+    """Ring buffer of executed trades stored as one preallocated array per field"""
+    
+    METRIC_FIELDS = ('sharpe_ratio', 'volatility', 'var_95', 'max_drawdown')
+    
+    def __init__(self, symbols: Tuple[str, ...], capacity: int = 10_000):
+        if len(symbols) > np.iinfo(np.int8).max + 1:
+            raise ValueError(f"TradeHistoryBuffer stores symbol codes as int8, got {len(symbols)} symbols")
+        self.symbols = symbols
+        self.capacity = capacity
+        self.timestamp = np.empty(capacity, dtype='datetime64[ns]')
+        # Index into symbols, so no strings are stored per trade
+        self.symbol_code = np.empty(capacity, dtype=np.int8)
+        self.is_buy = np.empty(capacity, dtype=bool)
+        self.amount = np.empty(capacity, dtype=np.float64)
+        self.predicted_price = np.empty(capacity, dtype=np.float64)
+        self.metrics = np.empty((capacity, len(self.METRIC_FIELDS)), dtype=np.float64)
+        # Total trades ever appended; the write slot is this modulo capacity
+        self._n = 0
+        
+    def __len__(self) -> int:
+        return min(self._n, self.capacity)
+        
+    def append(
+        self,
+        timestamp: np.datetime64,
+        symbol_code: int,
+        is_buy: bool,
+        amount: float,
+        predicted_price: float,
+        metrics: Tuple[float, float, float, float]
+    ) -> None:
+        """Record one trade, overwriting the oldest once the buffer is full"""
+        i = self._n % self.capacity
+        self.timestamp[i] = timestamp
+        self.symbol_code[i] = symbol_code
+        self.is_buy[i] = is_buy
+        self.amount[i] = amount
+        self.predicted_price[i] = predicted_price
+        self.metrics[i] = metrics
+        self._n += 1
+        
+    def to_frame(self) -> pd.DataFrame:
+        """Return the stored trades oldest first"""
+        n = len(self)
+        # Roll the ring so the oldest record comes first
+        order = (np.arange(n) + (self._n - n)) % self.capacity
+        frame = pd.DataFrame({
+            'timestamp': self.timestamp[order],
+            'symbol': pd.Categorical.from_codes(self.symbol_code[order], categories=list(self.symbols)),
+            'action': np.where(self.is_buy[order], 'buy', 'sell'),
+            'amount': self.amount[order],
+            'predicted_price': self.predicted_price[order],
+        })
+        frame[list(self.METRIC_FIELDS)] = self.metrics[order]
+        return frame
+
 class TradingExecutor:
     """Advanced trading execution system with ICP integration"""
     
@@ -27,39 +104,96 @@ class TradingExecutor:
         self.model = model
         self.portfolio_optimizer = ModernPortfolioOptimizer(config)
         self.current_positions: Dict[str, float] = {}
-        self.trade_history: List[Dict] = []
         # Use mainnet by default, can be overridden in config
         self.use_mainnet = config.get('icp', {}).get('use_mainnet', True)
         self.canister_id = config.get('icp', {}).get('canister_id', 'motoko_contracts_backend')
         # If using mainnet and no specific canister ID is provided, use the known mainnet ID
         if self.use_mainnet and self.canister_id == 'motoko_contracts_backend':
             self.canister_id = 'uccih-hiaaa-aaaag-at43q-cai'
+        # Model input buffers, allocated on the first GPU prediction
+        self._input_host: Optional[torch.Tensor] = None
+        self._input_dev: Optional[torch.Tensor] = None
+        # Config is fixed after construction, so read per-cycle values once
+        trading = config['trading']
+        self._symbols = tuple(config.get('data', {}).get('symbols', ['BTC/USDT', 'ETH/USDT']))
+        self._min_trade_size = trading['min_trade_size']
+        self._symbol_codes = {symbol: code for code, symbol in enumerate(self._symbols)}
+        # Most recent trades only; the oldest records drop off once max_history is reached
+        self.trade_history = TradeHistoryBuffer(self._symbols, trading.get('max_history', 10_000))
+        # Risk limits in RISK_METRIC_NAMES order, compared in one vector op per cycle
+        self._risk_thresholds = np.array([
+            trading['max_volatility'],
+            trading['max_var'],
+            trading['max_drawdown'],
+            -trading['min_sharpe_ratio']
+        ])
+        # Network and canister are fixed for the executor's lifetime, so build the dfx argv prefix once
+        self._dfx_prefix: Tuple[str, ...] = (
+            "dfx", "canister", *(("--network", "ic") if self.use_mainnet else ()), "call", self.canister_id
+        )
+        if not os.path.isdir(MOTOKO_PROJECT_DIR):
+            logger.warning(f"dfx project not found at {MOTOKO_PROJECT_DIR}")
+        # Per-cycle metrics with the cycle they belong to, sent to wandb every
+        # flush_every cycles and on close()
+        self._metric_buffer: List[Tuple[int, Dict[str, float]]] = []
+        self._metric_step = 0
+        self._last_trade_volume = 0.0
+        self._log_every = config.get('wandb', {}).get('flush_every', 10)
+        # Talk to the canister over one in-process agent instead of a dfx subprocess per call
+        self._icp_client = self._create_icp_client()
+        
+    def _create_icp_client(self) -> Optional['ICPCanisterClient']:
+        """Build the ic-py client, or None to fall back to the dfx CLI"""
+        if not IC_PY_AVAILABLE:
+            logger.info("ic-py not installed, using dfx for canister calls")
+            return None
+        # Outside the fallback below: a missing identity is a setup error, not a
+        # reason to quietly switch transports
+        icp = self.config.get('icp', {})
+        identity = load_dfx_identity(icp.get('identity'), icp.get('identity_pem'))
+        try:
+            canister_id = self.canister_id
+            if canister_id == 'motoko_contracts_backend':
+                # Local replica: look the name up the way dfx would
+                canister_id = ICPCanisterClient.resolve_canister_id(
+                    MOTOKO_PROJECT_DIR, canister_id, use_mainnet=self.use_mainnet
+                )
+            return ICPCanisterClient(canister_id, use_mainnet=self.use_mainnet, identity=identity)
+        except Exception as e:
+            logger.warning(f"Could not create ICP agent, using dfx for canister calls: {str(e)}")
+            return None
         
     async def execute_trading_cycle(self):
         """Execute one trading cycle"""
         try:
-            # Get predictions from model
-            predictions, uncertainties = await self._get_predictions()
+            # Predictions, the canister portfolio and market data don't depend on
+            # each other, so fetch them side by side
+            results = await asyncio.gather(
+                self._get_predictions(),
+                self._get_portfolio_from_icp(),
+                self._fetch_market_data(),
+                return_exceptions=True
+            )
+            failures = [
+                (step, result)
+                for step, result in zip(('predictions', 'portfolio', 'market data'), results)
+                if isinstance(result, Exception)
+            ]
+            for step, error in failures:
+                logger.error(f"Failed to get {step}: {str(error)}")
+            if failures:
+                raise failures[0][1]
+            (predictions, uncertainties), current_portfolio, market_data = results
             logger.info(f"Predictions shape: {predictions.shape}")
             logger.info(f"Uncertainties shape: {uncertainties.shape}")
             
             # Convert predictions to dict for optimizer
-            pred_dict = {}
-            uncert_dict = {}
-            symbols = self.config.get('data', {}).get('symbols', ['BTC/USDT', 'ETH/USDT'])
-            for i, symbol in enumerate(symbols):
-                pred_dict[symbol] = predictions[i].item()  # Each prediction is a scalar
-                uncert_dict[symbol] = uncertainties[i].item()
-            
-            # Get current portfolio from ICP canister
-            current_portfolio = await self._get_portfolio_from_icp()
-            
-            # Get market data for risk calculations
-            market_data = await self._fetch_market_data()
+            # One device->host transfer per tensor instead of an .item() sync per symbol
+            pred_dict = dict(zip(self._symbols, predictions.detach().reshape(-1).cpu().tolist()))
+            uncert_dict = dict(zip(self._symbols, uncertainties.detach().reshape(-1).cpu().tolist()))
             
             # Optimize portfolio allocation
-            optimizer = ModernPortfolioOptimizer(self.config)
-            target_portfolio, metrics = await optimizer.optimize_portfolio(
+            target_portfolio, metrics = await self.portfolio_optimizer.optimize_portfolio(
                 predictions=pred_dict,
                 uncertainties=uncert_dict,
                 current_weights=current_portfolio,
@@ -95,42 +229,78 @@ class TradingExecutor:
         try:
             data_module = self.model.trainer.datamodule
             latest_data = await data_module.get_latest_data()
-            
-            # Move to same device as model
-            latest_data = latest_data.to(self.model.device)
-            
-            with torch.no_grad():
-                predictions, uncertainties = self.model(latest_data)
+            device = self.model.device
+            
+            with torch.inference_mode():
+                if device.type == 'cuda':
+                    x = self._stage_input(latest_data, device)
+                    with torch.autocast(device_type='cuda', dtype=torch.bfloat16):
+                        predictions, uncertainties = self.model(x)
+                    # Back to fp32 before values are read out
+                    predictions, uncertainties = predictions.float(), uncertainties.float()
+                else:
+                    predictions, uncertainties = self.model(latest_data.to(device))
             return predictions, uncertainties
             
         except Exception as e:
             logger.error(f"Error in getting predictions: {str(e)}")
             raise
             
+    def _stage_input(self, latest_data: torch.Tensor, device: torch.device) -> torch.Tensor:
+        """Copy the input into persistent pinned host and device buffers, reallocating only on shape change"""
+        if self._input_host is None or self._input_host.shape != latest_data.shape:
+            self._input_host = torch.empty(latest_data.shape, dtype=latest_data.dtype, pin_memory=True)
+            self._input_dev = torch.empty(latest_data.shape, dtype=latest_data.dtype, device=device)
+        self._input_host.copy_(latest_data)
+        self._input_dev.copy_(self._input_host, non_blocking=True)
+        return self._input_dev
+        
+    async def _dfx(self, method: str, args: Optional[str] = None, output_json: bool = False) -> Any:
+        """Call a canister method through the dfx CLI without blocking the event loop
+
+        With output_json the reply is requested as JSON and returned parsed
+        instead of as Candid text.
+        """
+        cmd = (*self._dfx_prefix, method)
+        if output_json:
+            cmd += ("--output", "json")
+        if args:
+            cmd += (args,)
+            
+        # Run dfx from the motoko_contracts directory
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=MOTOKO_PROJECT_DIR,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        out, err = await proc.communicate()
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
+        if output_json:
+            # Both parsers accept the raw bytes, so skip the utf-8 decode
+            return JSON_LOADS(out)
+        return out.decode().strip()
+        
     async def _get_portfolio_from_icp(self) -> Dict[str, float]:
         """Get current portfolio state from ICP canister"""
         try:
-            # Build command with network parameter if using mainnet
-            cmd = ["dfx", "canister"]
-            if self.use_mainnet:
-                cmd.extend(["--network", "ic"])
-            cmd.extend(["call", self.canister_id, "getPortfolio"])
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd="/Users/chetanmittal/Desktop/icp-ai-trading-bot/motoko_contracts"
-            )
+            if self._icp_client is not None:
+                portfolio = await self._icp_client.get_portfolio()
+                logger.info(f"Portfolio values - BTC: {portfolio['btc']}, ETH: {portfolio['eth']}")
+                return {
+                    'BTC/USDT': portfolio['btc'],
+                    'ETH/USDT': portfolio['eth']
+                }
+                
+            portfolio = await self._dfx("getPortfolio", output_json=True)
             
             # Log raw response for debugging
-            logger.debug(f"Raw ICP response: {result.stdout}")
+            logger.debug(f"Raw ICP response: {portfolio}")
             
-            # Parse canister response format: (record { btc = 1000.0 : float64; eth = 1000.0 : float64 })
-            portfolio_str = result.stdout.strip()
-            btc_val = float(portfolio_str.split('btc = ')[1].split(' :')[0])
-            eth_val = float(portfolio_str.split('eth = ')[1].split(' :')[0])
+            # A multi-value reply comes back as a list; getPortfolio returns one record
+            if isinstance(portfolio, list):
+                portfolio = portfolio[0]
+            btc_val = float(portfolio['btc'])
+            eth_val = float(portfolio['eth'])
             
             logger.info(f"Parsed portfolio values - BTC: {btc_val}, ETH: {eth_val}")
             
@@ -150,6 +320,8 @@ class TradingExecutor:
     async def _fetch_market_data(self) -> pd.DataFrame:
         """Fetch recent market data for analysis"""
         try:
+            # The collector caches klines until the current bar closes, so repeated
+            # calls within a bar don't hit the exchange
             data_module = self.model.trainer.datamodule
             raw_data = await data_module.data_collector.collect_data()
             return raw_data
@@ -160,27 +332,25 @@ class TradingExecutor:
             
     def _validate_risk_metrics(self, metrics: PortfolioMetrics) -> bool:
         """Validate portfolio risk metrics against thresholds"""
-        # Check volatility
-        if metrics.volatility > self.config['trading']['max_volatility']:
-            logger.warning(f"Portfolio volatility {metrics.volatility:.2f} exceeds threshold {self.config['trading']['max_volatility']:.2f}")
-            return False
-            
-        # Check Value at Risk
-        if abs(metrics.var_95) > self.config['trading']['max_var']:
-            logger.warning(f"Portfolio VaR {abs(metrics.var_95):.2f} exceeds threshold {self.config['trading']['max_var']:.2f}")
-            return False
-            
-        # Check maximum drawdown
-        if metrics.max_drawdown > self.config['trading']['max_drawdown']:
-            logger.warning(f"Portfolio drawdown {metrics.max_drawdown:.2f} exceeds threshold {self.config['trading']['max_drawdown']:.2f}")
-            return False
-            
-        # Check Sharpe ratio
-        if metrics.sharpe_ratio < self.config['trading']['min_sharpe_ratio']:
-            logger.warning(f"Portfolio Sharpe ratio {metrics.sharpe_ratio:.2f} below threshold {self.config['trading']['min_sharpe_ratio']:.2f}")
-            return False
-            
-        return True
+        # Sharpe is a floor, so it is compared negated against the negated minimum
+        values = np.array([
+            metrics.volatility,
+            abs(metrics.var_95),
+            metrics.max_drawdown,
+            -metrics.sharpe_ratio
+        ])
+        exceeded = values > self._risk_thresholds
+        if not exceeded.any():
+            return True
+            
+        # Report the first limit that tripped, in the order they used to be checked
+        i = int(np.argmax(exceeded))
+        name = RISK_METRIC_NAMES[i]
+        if name == 'Sharpe ratio':
+            logger.warning(f"Portfolio Sharpe ratio {-values[i]:.2f} below threshold {-self._risk_thresholds[i]:.2f}")
+        else:
+            logger.warning(f"Portfolio {name} {values[i]:.2f} exceeds threshold {self._risk_thresholds[i]:.2f}")
+        return False
         
     def _generate_trades(
         self,
@@ -188,79 +358,66 @@ class TradingExecutor:
         target_portfolio: Dict[str, float]
     ) -> List[Dict]:
         """Generate trades to move from current to target portfolio"""
-        trades = []
-        total_value = sum(current_portfolio.values())
+        # Weight differences for every symbol at once, then keep those above the minimum
+        symbols = np.array(list(current_portfolio))
+        current = np.fromiter(current_portfolio.values(), dtype=np.float64, count=len(symbols))
+        target = np.fromiter((target_portfolio[s] for s in symbols), dtype=np.float64, count=len(symbols))
+        total_value = current.sum()
+        target_weights = target / total_value
+        weight_diff = target_weights - current / total_value
         
-        for symbol in current_portfolio:
-            current_weight = current_portfolio[symbol] / total_value
-            target_weight = target_portfolio[symbol] / total_value
-            weight_diff = target_weight - current_weight
-            
-            # Only trade if difference exceeds minimum size
-            if abs(weight_diff) > self.config['trading']['min_trade_size']:
-                trades.append({
-                    'symbol': symbol,
-                    'action': 'buy' if weight_diff > 0 else 'sell',
-                    'amount': abs(weight_diff) * total_value,
-                    'prediction': target_weight
-                })
-                
-        return trades
+        # Only trade if difference exceeds minimum size
+        mask = np.abs(weight_diff) > self._min_trade_size
+        actions = np.where(weight_diff[mask] > 0, 'buy', 'sell')
+        amounts = np.abs(weight_diff[mask]) * total_value
+        # Kept for _log_execution_metrics so it doesn't walk the trades again
+        self._last_trade_volume = float(amounts.sum())
+        
+        return [
+            {
+                'symbol': symbol,
+                'action': action,
+                'amount': amount,
+                'prediction': prediction
+            }
+            for symbol, action, amount, prediction in zip(
+                symbols[mask].tolist(), actions.tolist(), amounts.tolist(), target_weights[mask].tolist()
+            )
+        ]
         
     async def _execute_trades_on_icp(self, trades: List[Dict]) -> None:
         """Execute trades through ICP canister"""
         try:
-            # First set the predictions on the canister
             predictions = {t['symbol']: t['prediction'] for t in trades}
-            
-            # Build command with network parameter if using mainnet
-            cmd = ["dfx", "canister"]
-            if self.use_mainnet:
-                cmd.extend(["--network", "ic"])
-            cmd.extend(["call", self.canister_id, "setPredictions", 
-                     f"({predictions.get('BTC/USDT', 0.0)}, {predictions.get('ETH/USDT', 0.0)})"])
-            
-            # Run dfx from the motoko_contracts directory
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd="/Users/chetanmittal/Desktop/icp-ai-trading-bot/motoko_contracts"
-            )
-            logger.info("Set predictions on ICP canister")
-
-            # Trigger rebalance
-            cmd = ["dfx", "canister"]
-            if self.use_mainnet:
-                cmd.extend(["--network", "ic"])
-            cmd.extend(["call", self.canister_id, "rebalance"])
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd="/Users/chetanmittal/Desktop/icp-ai-trading-bot/motoko_contracts"
-            )
-            logger.info(f"Rebalance result: {result.stdout}")
-            
-            # Update metrics on the canister
-            if hasattr(self, 'latest_metrics') and self.latest_metrics:
-                cmd = ["dfx", "canister"]
-                if self.use_mainnet:
-                    cmd.extend(["--network", "ic"])
-                cmd.extend(["call", self.canister_id, "updateMetrics", 
-                         f"({self.latest_metrics.sharpe_ratio}, {self.latest_metrics.volatility}, {self.latest_metrics.var_95}, {self.latest_metrics.max_drawdown})"])
+            btc_pred = predictions.get('BTC/USDT', 0.0)
+            eth_pred = predictions.get('ETH/USDT', 0.0)
+            metrics = getattr(self, 'latest_metrics', None)
+            
+            if self._icp_client is not None:
+                if metrics:
+                    # Predictions, metrics and the rebalance in one consensus round
+                    result = await self._icp_client.execute_cycle(
+                        btc_pred, eth_pred,
+                        metrics.sharpe_ratio, metrics.volatility, metrics.var_95, metrics.max_drawdown
+                    )
+                else:
+                    await self._icp_client.set_predictions(btc_pred, eth_pred)
+                    result = await self._icp_client.rebalance()
+                logger.info(f"Rebalance result: {result}")
+                return
                 
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    cwd="/Users/chetanmittal/Desktop/icp-ai-trading-bot/motoko_contracts"
+            if metrics:
+                # One dfx call stores predictions and metrics and rebalances
+                result = await self._dfx(
+                    "executeCycle",
+                    f"({btc_pred}, {eth_pred}, {metrics.sharpe_ratio}, {metrics.volatility}, "
+                    f"{metrics.var_95}, {metrics.max_drawdown})"
                 )
-                logger.info("Updated metrics on ICP canister")
+            else:
+                await self._dfx("setPredictions", f"({btc_pred}, {eth_pred})")
+                logger.info("Set predictions on ICP canister")
+                result = await self._dfx("rebalance")
+            logger.info(f"Rebalance result: {result}")
 
         except Exception as e:
             logger.error(f"Error executing trades on ICP: {str(e)}")
@@ -275,28 +432,33 @@ class TradingExecutor:
         """Update trade history with execution details"""
         try:
             # Convert predictions to dictionary
-            pred_dict = {
-                self.config['data']['symbols'][i]: pred.item()
-                for i, pred in enumerate(predictions)
-            }
+            pred_dict = dict(zip(
+                self._symbols,
+                predictions.detach().reshape(-1).cpu().tolist()
+            ))
+            
+            metric_values = (
+                metrics.sharpe_ratio,
+                metrics.volatility,
+                metrics.var_95,
+                metrics.max_drawdown
+            )
+            # Trades in one cycle share a timestamp (UTC)
+            timestamp = np.datetime64('now', 'ns')
             
             for trade in trades:
-                trade_record = {
-                    'timestamp': datetime.now().isoformat(),
-                    'symbol': trade['symbol'],
-                    'action': trade['action'],
-                    'amount': trade['amount'],
-                    'predicted_price': pred_dict[trade['symbol']],
-                    'portfolio_metrics': {
-                        'sharpe_ratio': metrics.sharpe_ratio,
-                        'volatility': metrics.volatility,
-                        'var_95': metrics.var_95,
-                        'max_drawdown': metrics.max_drawdown
-                    }
-                }
-                
-                self.trade_history.append(trade_record)
-                logger.info(f"Trade recorded: {trade_record}")
+                self.trade_history.append(
+                    timestamp,
+                    self._symbol_codes[trade['symbol']],
+                    trade['action'] == 'buy',
+                    trade['amount'],
+                    pred_dict[trade['symbol']],
+                    metric_values
+                )
+                logger.info(
+                    f"Trade recorded: {trade['action']} {trade['amount']:.4f} {trade['symbol']} "
+                    f"(predicted {pred_dict[trade['symbol']]:.4f})"
+                )
                 
         except Exception as e:
             logger.error(f"Error updating trade history: {str(e)}")
@@ -312,17 +474,35 @@ class TradingExecutor:
             if not WANDB_AVAILABLE:
                 return
                 
-            wandb.log({
+            self._metric_buffer.append((self._metric_step, {
                 'sharpe_ratio': metrics.sharpe_ratio,
                 'volatility': metrics.volatility,
                 'var_95': metrics.var_95,
                 'max_drawdown': metrics.max_drawdown,
                 'trade_count': len(trades),
-                'total_trade_volume': sum(trade['amount'] for trade in trades)
-            })
+                'total_trade_volume': self._last_trade_volume
+            }))
+            self._metric_step += 1
+            if len(self._metric_buffer) >= self._log_every:
+                self._flush_metrics()
         except Exception as e:
             logger.error(f"Error logging execution metrics: {str(e)}")
             
+    def _flush_metrics(self):
+        """Send buffered cycle metrics to wandb, one history row per cycle at its own step"""
+        if not self._metric_buffer:
+            return
+        try:
+            buffer, self._metric_buffer = self._metric_buffer, []
+            for step, row in buffer:
+                wandb.log(row, step=step)
+        except Exception as e:
+            logger.error(f"Error flushing execution metrics: {str(e)}")
+            
+    def close(self):
+        """Flush metrics still buffered from the last cycles"""
+        self._flush_metrics()
+            
     async def run(self):
         """Run continuous trading execution"""
         try:
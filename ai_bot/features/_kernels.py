@@ -0,0 +1,95 @@
+"""Numba kernels for the per-symbol feature loops in feature_engineer
+
+Signatures are explicit so the kernels compile eagerly at import, and
+cache=True keeps the machine code on disk for later processes. fastmath is
+left off because the kernels rely on NaN for incomplete windows. Inputs and
+outputs are float32 like the rest of the feature block; running sums are
+kept in float64 locals.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Column order of price_features_kernel's output
+PRICE_FEATURE_COLUMNS = (
+    'price_change', 'price_change_1h', 'price_change_4h', 'price_change_24h',
+    'high_low_ratio', 'close_open_ratio',
+    'volatility_1h', 'volatility_4h', 'volatility_24h'
+)
+
+if NUMBA_AVAILABLE:
+    # error_model='numpy' so a zero price gives inf/nan like pandas instead of raising
+    @njit('void(float32[:], int64, float32[:])', cache=True, error_model='numpy')
+    def _pct_change(x, k, out):
+        """x[i] / x[i - k] - 1, NaN for the first k rows (pandas pct_change)"""
+        n = x.shape[0]
+        for i in range(min(k, n)):
+            out[i] = np.nan
+        for i in range(k, n):
+            out[i] = x[i] / x[i - k] - 1.0
+
+    @njit('void(float32[:], int64, float32[:], float32[:])', cache=True, error_model='numpy')
+    def _rolling_moments(x, w, out_mean, out_std):
+        """Mean and sample std over a trailing window of w rows, NaN unless all w are present
+
+        Welford's update with the outgoing value removed, so one pass regardless
+        of w. NaNs are kept out of the running sums and only hold the output at
+        NaN while they are inside the window, as pandas rolling(w) does.
+        """
+        out_mean[:] = np.nan
+        out_std[:] = np.nan
+        mean = 0.0
+        m2 = 0.0
+        n = 0
+        for i in range(x.shape[0]):
+            v = x[i]
+            if not np.isnan(v):
+                n += 1
+                d = v - mean
+                mean += d / n
+                m2 += d * (v - mean)
+            if i >= w:
+                u = x[i - w]
+                if not np.isnan(u):
+                    n -= 1
+                    if n == 0:
+                        mean = 0.0
+                        m2 = 0.0
+                    else:
+                        d = u - mean
+                        mean -= d / n
+                        m2 -= d * (u - mean)
+            if n == w:
+                out_mean[i] = mean
+                if w > 1:
+                    out_std[i] = np.sqrt(max(m2, 0.0) / (w - 1))
+
+    @njit('UniTuple(float32[::1], 2)(float32[:], int64)', cache=True, error_model='numpy')
+    def rolling_mean_std(x, w):
+        """Rolling mean and sample std of x over w rows, matching pandas rolling(w).mean()/.std()"""
+        out_mean = np.empty(x.shape[0], dtype=np.float32)
+        out_std = np.empty(x.shape[0], dtype=np.float32)
+        _rolling_moments(x, w, out_mean, out_std)
+        return out_mean, out_std
+
+    @njit('float32[:, ::1](float32[:], float32[:], float32[:], float32[:])', cache=True, error_model='numpy')
+    def price_features_kernel(open_, high, low, close):
+        """All price features for one symbol as an (N, 9) array in PRICE_FEATURE_COLUMNS order"""
+        n = close.shape[0]
+        out = np.empty((n, 9), dtype=np.float32)
+        _pct_change(close, 1, out[:, 1])
+        _pct_change(close, 4, out[:, 2])
+        _pct_change(close, 24, out[:, 3])
+        out[:, 0] = out[:, 1]
+        for i in range(n):
+            out[i, 4] = high[i] / low[i]
+            out[i, 5] = close[i] / open_[i]
+        means = np.empty(n, dtype=np.float32)
+        _rolling_moments(out[:, 1], 1, means, out[:, 6])
+        _rolling_moments(out[:, 2], 4, means, out[:, 7])
+        _rolling_moments(out[:, 3], 24, means, out[:, 8])
+        return out
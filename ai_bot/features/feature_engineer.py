@@ -1,16 +1,53 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 from ta.trend import SMAIndicator, EMAIndicator, MACD
 from ta.momentum import RSIIndicator, StochasticOscillator
 from ta.volatility import BollingerBands, AverageTrueRange
-from ta.volume import OnBalanceVolumeIndicator
 import torch
-from sklearn.preprocessing import StandardScaler
 import logging
 
+from ._kernels import NUMBA_AVAILABLE, PRICE_FEATURE_COLUMNS
+
+if NUMBA_AVAILABLE:
+    from ._kernels import price_features_kernel, rolling_mean_std
+
+try:
+    import talib
+    TALIB_AVAILABLE = True
+except ImportError:
+    TALIB_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Bump whenever a change alters the feature columns or their values, so
+# sequences cached by the data module under the old definitions are rebuilt
+FEATURE_SCHEMA_VERSION = 1
+
+# Indicators whose early rows differ between TA-Lib and ta: the EMA-based ones
+# are seeded differently (SMA of the first window vs the first value), ta's ATR
+# leads with zeros and TA-Lib aligns stoch_k's lead-in with stoch_d's. The seed's
+# weight decays geometrically, so past this many rows the two agree to float32
+# precision; earlier rows are blanked on both paths
+SEEDED_INDICATOR_COLUMNS = ['ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_diff', 'rsi', 'atr', 'stoch_k']
+INDICATOR_WARMUP = 200
+
+# Per-symbol standardization stats as plain arrays; same mean_/scale_ as sklearn's StandardScaler
+class _Standardizer:
+    __slots__ = ('mean_', 'scale_')
+
+    def __init__(self, mean_, scale_):
+        self.mean_ = mean_
+        self.scale_ = scale_
+
+    def transform(self, x):
+        return (x - self.mean_) / self.scale_
+
+    def inverse_transform(self, x):
+        return x * self.scale_ + self.mean_
+
 class FeatureEngineer:
     """Advanced feature engineering for crypto trading"""
     
@@ -26,199 +63,247 @@ class FeatureEngineer:
         
     def _handle_nan_values(self, df: pd.DataFrame, method: str = 'ffill') -> pd.DataFrame:
         """
-        Handle NaN values in the DataFrame
+        Handle NaN values in the DataFrame in place
         
         Args:
-            df: Input DataFrame
+            df: Input DataFrame, owned by the caller and filled in place
             method: Method to handle NaN values ('ffill', 'bfill', or 'both')
             
         Returns:
-            DataFrame with NaN values handled
+            The same DataFrame with NaN values handled
         """
-        # Make a copy to avoid modifying the original
-        df = df.copy()
+        # One NaN scan, reused for the logging and for every fill decision below
+        mask = df.isna().to_numpy()
+        if not mask.any():
+            return df
         
         # Log NaN status before cleaning
-        nan_cols = df.isna().sum()
-        if nan_cols.any():
+        if logger.isEnabledFor(logging.DEBUG):
+            nan_counts = mask.sum(axis=0)
             logger.debug("NaN values before cleaning:")
-            for col in nan_cols[nan_cols > 0].index:
-                logger.debug(f"{col}: {nan_cols[col]}")
+            for col, count in zip(df.columns[nan_counts > 0], nan_counts[nan_counts > 0]):
+                logger.debug(f"{col}: {count}")
         
         if method == 'ffill' or method == 'both':
-            df = df.ffill()
+            df.ffill(inplace=True)
         if method == 'bfill' or method == 'both':
-            df = df.bfill()
+            df.bfill(inplace=True)
             
-        # For any remaining NaNs (e.g., at the start of the series), fill with zeros
-        if df.isna().any().any():
-            df = df.fillna(0)
+        # For any remaining NaNs (e.g., at the start of the series), fill with zeros.
+        # Leading NaNs survive ffill, trailing ones survive bfill, and only
+        # all-NaN columns survive both
+        if method == 'both':
+            remaining = mask.all(axis=0)
+        elif method == 'ffill':
+            remaining = mask[0]
+        elif method == 'bfill':
+            remaining = mask[-1]
+        else:
+            remaining = mask.any(axis=0)
+        if remaining.any():
+            df.fillna(dict.fromkeys(df.columns[remaining], 0), inplace=True)
             
         return df
         
-    def _add_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Add technical analysis indicators"""
+    @staticmethod
+    def _symbol_groups(symbol: pd.Series) -> Tuple[np.ndarray, pd.Index, np.ndarray]:
+        """
+        Factorize the symbol column of a frame sorted by symbol
+        
+        Returns:
+            Tuple of (per-row symbol codes, symbols, start row of each symbol's run)
+        """
+        codes, symbols = pd.factorize(symbol)
+        # Rows are sorted by symbol, so each symbol is one contiguous run
+        starts = np.searchsorted(codes, np.arange(len(symbols)))
+        return codes, symbols, starts
+        
+    def _add_features(self, df: pd.DataFrame, groups: Tuple[np.ndarray, pd.Index, np.ndarray]) -> pd.DataFrame:
+        """
+        Add technical, price and volume features in one pass over each symbol
+        
+        Args:
+            df: Market data sorted by symbol then timestamp
+            groups: _symbol_groups of df
+            
+        Returns:
+            DataFrame with the filled inputs and feature columns
+        """
         try:
-            # Process each symbol separately
-            all_data = []
-            for symbol in df['symbol'].unique():
-                symbol_data = df[df['symbol'] == symbol].copy()
-                symbol_data = symbol_data.sort_values('timestamp')  # Ensure data is sorted
-                
-                # Store non-feature columns
-                timestamp = symbol_data['timestamp']
-                symbol_col = symbol_data['symbol']
-                
-                # Convert price/volume columns to numeric, replacing any invalid values with NaN
-                numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-                for col in numeric_cols:
-                    symbol_data[col] = pd.to_numeric(symbol_data[col], errors='coerce')
+            codes, _, starts = groups
+            stops = np.append(starts[1:], len(codes))
+            
+            # Every symbol's columns are written into one block allocated on the
+            # first symbol, instead of concatenating per-symbol frames
+            feature_columns = None
+            out = None
+            for start, stop in zip(starts, stops):
+                # The one copy per symbol; fills and feature columns then go into it in place
+                symbol_data = df.iloc[start:stop].copy()
                 
                 # Handle any NaN values in input data
-                symbol_data = self._handle_nan_values(symbol_data, method='both')
+                self._handle_nan_values(symbol_data, method='both')
                 
                 # Calculate indicators
-                # Trend
-                symbol_data['sma_20'] = SMAIndicator(close=symbol_data['close'], window=20).sma_indicator()
-                symbol_data['sma_50'] = SMAIndicator(close=symbol_data['close'], window=50).sma_indicator()
-                symbol_data['ema_12'] = EMAIndicator(close=symbol_data['close'], window=12).ema_indicator()
-                symbol_data['ema_26'] = EMAIndicator(close=symbol_data['close'], window=26).ema_indicator()
-                
-                # MACD
-                macd = MACD(close=symbol_data['close'])
-                symbol_data['macd'] = macd.macd()
-                symbol_data['macd_signal'] = macd.macd_signal()
-                symbol_data['macd_diff'] = macd.macd_diff()
-                
-                # Momentum
-                symbol_data['rsi'] = RSIIndicator(close=symbol_data['close']).rsi()
-                
-                stoch = StochasticOscillator(
-                    high=symbol_data['high'],
-                    low=symbol_data['low'],
-                    close=symbol_data['close']
-                )
-                symbol_data['stoch_k'] = stoch.stoch()
-                symbol_data['stoch_d'] = stoch.stoch_signal()
-                
-                # Volatility
-                bb = BollingerBands(close=symbol_data['close'])
-                symbol_data['bb_high'] = bb.bollinger_hband()
-                symbol_data['bb_low'] = bb.bollinger_lband()
-                symbol_data['bb_mid'] = bb.bollinger_mavg()
-                
-                symbol_data['atr'] = AverageTrueRange(
-                    high=symbol_data['high'],
-                    low=symbol_data['low'],
-                    close=symbol_data['close']
-                ).average_true_range()
-                
-                # Handle NaN values created by indicators
-                symbol_data = self._handle_nan_values(symbol_data, method='both')
+                if TALIB_AVAILABLE:
+                    self._talib_indicators(symbol_data)
+                else:
+                    self._ta_indicators(symbol_data)
+                self._trim_indicator_warmup(symbol_data)
+                self._price_features(symbol_data)
+                self._volume_features(symbol_data)
                 
-                # Restore non-feature columns
-                symbol_data['timestamp'] = timestamp
-                symbol_data['symbol'] = symbol_col
+                # Handle NaN values created by the features; they only read the
+                # already-filled inputs, so one pass at the end is enough
+                self._handle_nan_values(symbol_data, method='both')
                 
-                all_data.append(symbol_data)
-            
-            result = pd.concat(all_data)
-            logger.info(f"Technical indicators shape: {result.shape}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error adding technical indicators: {str(e)}")
-            raise
+                if out is None:
+                    feature_columns = symbol_data.columns.drop(['timestamp', 'symbol'])
+                    out = np.empty((len(df), len(feature_columns)), dtype=np.float32)
+                out[start:stop] = symbol_data[feature_columns].to_numpy(dtype=np.float32)
             
-    def _add_price_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Add price-based features"""
-        try:
-            # Process each symbol separately
-            all_data = []
-            for symbol in df['symbol'].unique():
-                symbol_data = df[df['symbol'] == symbol].copy()
-                symbol_data = symbol_data.sort_values('timestamp')
-                
-                # Store non-feature columns
-                timestamp = symbol_data['timestamp']
-                symbol_col = symbol_data['symbol']
-                
-                # Price changes
-                symbol_data['price_change'] = symbol_data['close'].pct_change()
-                symbol_data['price_change_1h'] = symbol_data['close'].pct_change(periods=1)
-                symbol_data['price_change_4h'] = symbol_data['close'].pct_change(periods=4)
-                symbol_data['price_change_24h'] = symbol_data['close'].pct_change(periods=24)
-                
-                # Price ratios
-                symbol_data['high_low_ratio'] = symbol_data['high'] / symbol_data['low']
-                symbol_data['close_open_ratio'] = symbol_data['close'] / symbol_data['open']
-                
-                # Price volatility
-                symbol_data['volatility_1h'] = symbol_data['price_change_1h'].rolling(window=1).std()
-                symbol_data['volatility_4h'] = symbol_data['price_change_4h'].rolling(window=4).std()
-                symbol_data['volatility_24h'] = symbol_data['price_change_24h'].rolling(window=24).std()
-                
-                # Handle NaN values
-                symbol_data = self._handle_nan_values(symbol_data, method='both')
-                
-                # Restore non-feature columns
-                symbol_data['timestamp'] = timestamp
-                symbol_data['symbol'] = symbol_col
-                
-                all_data.append(symbol_data)
+            if out is None:
+                return df
             
-            result = pd.concat(all_data)
-            logger.info(f"Price features shape: {result.shape}")
+            result = pd.DataFrame(out, columns=feature_columns, index=df.index, copy=False)
+            result.insert(0, 'timestamp', df['timestamp'])
+            result['symbol'] = df['symbol']
+            logger.info(f"Features shape: {result.shape}")
             return result
             
         except Exception as e:
-            logger.error(f"Error adding price features: {str(e)}")
+            logger.error(f"Error adding features: {str(e)}")
             raise
             
-    def _add_volume_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Add volume-based features"""
-        try:
-            # Process each symbol separately
-            all_data = []
-            for symbol in df['symbol'].unique():
-                symbol_data = df[df['symbol'] == symbol].copy()
-                symbol_data = symbol_data.sort_values('timestamp')
-                
-                # Store non-feature columns
-                timestamp = symbol_data['timestamp']
-                symbol_col = symbol_data['symbol']
-                
-                # Volume changes
-                symbol_data['volume_change'] = symbol_data['volume'].pct_change()
-                symbol_data['volume_ma_20'] = symbol_data['volume'].rolling(window=20).mean()
-                symbol_data['volume_ma_50'] = symbol_data['volume'].rolling(window=50).mean()
-                
-                # Volume indicators
-                symbol_data['obv'] = OnBalanceVolumeIndicator(
-                    close=symbol_data['close'],
-                    volume=symbol_data['volume']
-                ).on_balance_volume()
-                
-                # Volume ratios
-                symbol_data['volume_price_ratio'] = symbol_data['volume'] / symbol_data['close']
-                symbol_data['volume_volatility'] = symbol_data['volume'].rolling(window=20).std()
-                
-                # Handle NaN values
-                symbol_data = self._handle_nan_values(symbol_data, method='both')
-                
-                # Restore non-feature columns
-                symbol_data['timestamp'] = timestamp
-                symbol_data['symbol'] = symbol_col
-                
-                all_data.append(symbol_data)
+    @staticmethod
+    def _talib_indicators(symbol_data: pd.DataFrame) -> None:
+        """Add indicator columns computed by TA-Lib's C routines on the raw arrays"""
+        # TA-Lib's C API only takes double arrays
+        close = symbol_data['close'].to_numpy(dtype=np.float64)
+        high = symbol_data['high'].to_numpy(dtype=np.float64)
+        low = symbol_data['low'].to_numpy(dtype=np.float64)
+        
+        # Trend
+        symbol_data['sma_20'] = talib.SMA(close, timeperiod=20)
+        symbol_data['sma_50'] = talib.SMA(close, timeperiod=50)
+        symbol_data['ema_12'] = talib.EMA(close, timeperiod=12)
+        symbol_data['ema_26'] = talib.EMA(close, timeperiod=26)
+        
+        # MACD
+        macd, macd_signal, macd_diff = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+        symbol_data['macd'] = macd
+        symbol_data['macd_signal'] = macd_signal
+        symbol_data['macd_diff'] = macd_diff
+        
+        # Momentum; fast %K and its 3-period SMA match ta's StochasticOscillator
+        symbol_data['rsi'] = talib.RSI(close, timeperiod=14)
+        stoch_k, stoch_d = talib.STOCHF(high, low, close, fastk_period=14, fastd_period=3, fastd_matype=0)
+        symbol_data['stoch_k'] = stoch_k
+        symbol_data['stoch_d'] = stoch_d
+        
+        # Volatility
+        bb_high, bb_mid, bb_low = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+        symbol_data['bb_high'] = bb_high
+        symbol_data['bb_low'] = bb_low
+        symbol_data['bb_mid'] = bb_mid
+        
+        symbol_data['atr'] = talib.ATR(high, low, close, timeperiod=14)
+        
+    @staticmethod
+    def _ta_indicators(symbol_data: pd.DataFrame) -> None:
+        """Add indicator columns with the pure-Python ta package"""
+        # Trend
+        symbol_data['sma_20'] = SMAIndicator(close=symbol_data['close'], window=20).sma_indicator()
+        symbol_data['sma_50'] = SMAIndicator(close=symbol_data['close'], window=50).sma_indicator()
+        symbol_data['ema_12'] = EMAIndicator(close=symbol_data['close'], window=12).ema_indicator()
+        symbol_data['ema_26'] = EMAIndicator(close=symbol_data['close'], window=26).ema_indicator()
+        
+        # MACD
+        macd = MACD(close=symbol_data['close'])
+        symbol_data['macd'] = macd.macd()
+        symbol_data['macd_signal'] = macd.macd_signal()
+        symbol_data['macd_diff'] = macd.macd_diff()
+        
+        # Momentum
+        symbol_data['rsi'] = RSIIndicator(close=symbol_data['close']).rsi()
+        
+        stoch = StochasticOscillator(
+            high=symbol_data['high'],
+            low=symbol_data['low'],
+            close=symbol_data['close']
+        )
+        symbol_data['stoch_k'] = stoch.stoch()
+        symbol_data['stoch_d'] = stoch.stoch_signal()
+        
+        # Volatility
+        bb = BollingerBands(close=symbol_data['close'])
+        symbol_data['bb_high'] = bb.bollinger_hband()
+        symbol_data['bb_low'] = bb.bollinger_lband()
+        symbol_data['bb_mid'] = bb.bollinger_mavg()
+        
+        symbol_data['atr'] = AverageTrueRange(
+            high=symbol_data['high'],
+            low=symbol_data['low'],
+            close=symbol_data['close']
+        ).average_true_range()
             
-            result = pd.concat(all_data)
-            logger.info(f"Volume features shape: {result.shape}")
-            return result
+    @staticmethod
+    def _trim_indicator_warmup(symbol_data: pd.DataFrame) -> None:
+        """Blank the seeded indicators' warm-up rows so either indicator backend gives the same features"""
+        columns = symbol_data.columns.get_indexer(SEEDED_INDICATOR_COLUMNS)
+        symbol_data.iloc[:INDICATOR_WARMUP, columns] = np.nan
+        
+    @staticmethod
+    def _price_features(symbol_data: pd.DataFrame) -> None:
+        """Add price-based features"""
+        if NUMBA_AVAILABLE:
+            # Every price column from one compiled pass over the OHLC arrays
+            symbol_data[list(PRICE_FEATURE_COLUMNS)] = price_features_kernel(
+                *(symbol_data[col].to_numpy(dtype=np.float32) for col in ('open', 'high', 'low', 'close'))
+            )
+            return
             
-        except Exception as e:
-            logger.error(f"Error adding volume features: {str(e)}")
-            raise
+        # Price changes; a missing close stays missing rather than being padded, as in the kernel
+        symbol_data['price_change'] = symbol_data['close'].pct_change(fill_method=None)
+        symbol_data['price_change_1h'] = symbol_data['close'].pct_change(periods=1, fill_method=None)
+        symbol_data['price_change_4h'] = symbol_data['close'].pct_change(periods=4, fill_method=None)
+        symbol_data['price_change_24h'] = symbol_data['close'].pct_change(periods=24, fill_method=None)
+        
+        # Price ratios
+        symbol_data['high_low_ratio'] = symbol_data['high'] / symbol_data['low']
+        symbol_data['close_open_ratio'] = symbol_data['close'] / symbol_data['open']
+        
+        # Price volatility
+        symbol_data['volatility_1h'] = symbol_data['price_change_1h'].rolling(window=1).std()
+        symbol_data['volatility_4h'] = symbol_data['price_change_4h'].rolling(window=4).std()
+        symbol_data['volatility_24h'] = symbol_data['price_change_24h'].rolling(window=24).std()
+        
+    @staticmethod
+    def _volume_features(symbol_data: pd.DataFrame) -> None:
+        """Add volume-based features"""
+        close = symbol_data['close'].to_numpy(dtype=np.float32)
+        volume = symbol_data['volume'].to_numpy(dtype=np.float32)
+        
+        # Volume changes
+        symbol_data['volume_change'] = symbol_data['volume'].pct_change()
+        if NUMBA_AVAILABLE:
+            # O(N) streaming windows; the 20-row pass gives both the MA and the volatility
+            volume_ma_20, volume_volatility = rolling_mean_std(volume, 20)
+            symbol_data['volume_ma_20'] = volume_ma_20
+            symbol_data['volume_ma_50'] = rolling_mean_std(volume, 50)[0]
+        else:
+            symbol_data['volume_ma_20'] = symbol_data['volume'].rolling(window=20).mean()
+            symbol_data['volume_ma_50'] = symbol_data['volume'].rolling(window=50).mean()
+            volume_volatility = symbol_data['volume'].rolling(window=20).std()
+        
+        # Volume indicators: OBV subtracts volume when the close fell and adds it
+        # otherwise, so flat closes and the first row add volume as in ta
+        falling = np.diff(close, prepend=close[:1]) < 0
+        symbol_data['obv'] = np.cumsum(np.where(falling, -volume, volume))
+        
+        # Volume ratios
+        symbol_data['volume_price_ratio'] = volume / close
+        symbol_data['volume_volatility'] = volume_volatility
             
     def create_features(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         """
@@ -231,55 +316,49 @@ class FeatureEngineer:
             DataFrame with engineered features
         """
         try:
-            df = data['market_data'].copy()
+            df = data['market_data']
             logger.info(f"Input data shape: {df.shape}")
-            logger.info(f"Input symbols: {df['symbol'].unique().tolist()}")
             
-            # Sort by timestamp to ensure correct feature calculation
+            # Sort by timestamp to ensure correct feature calculation; the sorted
+            # frame is a new one, so the caller's data is never modified
             df = df.sort_values(['symbol', 'timestamp'])
             
-            # Add technical indicators
-            df = self._add_technical_indicators(df)
-            logger.info(f"After technical indicators shape: {df.shape}")
+            # Symbol codes and row ranges, shared by every per-symbol step below
+            groups = self._symbol_groups(df['symbol'])
+            logger.info(f"Input symbols: {groups[1].tolist()}")
             
-            # Add price features
-            df = self._add_price_features(df)
-            logger.info(f"After price features shape: {df.shape}")
+            # Convert price/volume columns to numeric, replacing any invalid values with NaN,
+            # and run the feature math in float32 (the collector already stores them that way)
+            for col in OHLCV_COLUMNS:
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                if df[col].dtype != np.float32:
+                    df[col] = df[col].astype(np.float32)
             
-            # Add volume features
-            df = self._add_volume_features(df)
-            logger.info(f"After volume features shape: {df.shape}")
+            # Add technical, price and volume features
+            df = self._add_features(df, groups)
+            logger.info(f"After features shape: {df.shape}")
             
             # Handle any remaining NaN values
             nan_count_before = df.isna().sum().sum()
             if nan_count_before > 0:
                 logger.warning(f"Found {nan_count_before} NaN values before final cleaning")
-                df = self._handle_nan_values(df, method='both')
+                self._handle_nan_values(df, method='both')
                 nan_count_after = df.isna().sum().sum()
                 if nan_count_after > 0:
                     logger.warning(f"Still have {nan_count_after} NaN values after cleaning")
                     # Only drop rows if we really have to
                     df = df.dropna()
+                    groups = self._symbol_groups(df['symbol'])
                 logger.info(f"After final cleaning shape: {df.shape}")
             
             # Scale features
             feature_columns = df.columns.difference(['symbol', 'timestamp'])
-            for symbol in df['symbol'].unique():
-                symbol_mask = df['symbol'] == symbol
-                
-                if symbol not in self.scalers:
-                    self.scalers[symbol] = StandardScaler()
-                    df.loc[symbol_mask, feature_columns] = self.scalers[symbol].fit_transform(
-                        df.loc[symbol_mask, feature_columns]
-                    )
-                else:
-                    df.loc[symbol_mask, feature_columns] = self.scalers[symbol].transform(
-                        df.loc[symbol_mask, feature_columns]
-                    )
+            self._scale_features(df, feature_columns, groups)
             
             logger.info(f"Created {len(feature_columns)} features")
             logger.info(f"Final output shape: {df.shape}")
-            logger.info(f"Output symbols: {df['symbol'].unique().tolist()}")
+            logger.info(f"Output symbols: {groups[1].tolist()}")
             
             return df
             
@@ -287,6 +366,64 @@ class FeatureEngineer:
             logger.error(f"Error creating features: {str(e)}")
             raise
             
+    def _scale_features(
+        self,
+        df: pd.DataFrame,
+        feature_columns: pd.Index,
+        groups: Tuple[np.ndarray, pd.Index, np.ndarray]
+    ) -> None:
+        """Standardize feature columns per symbol in place, fitting stats for unseen symbols
+        
+        Only the symbol codes of groups are used, so rows need not be grouped by symbol.
+        """
+        codes, symbols, _ = groups
+        values = df[feature_columns].to_numpy(dtype=np.float32)
+        
+        if any(symbol not in self.scalers for symbol in symbols):
+            # Reduce over each symbol's rows as one run, reordering only if the
+            # rows are not already grouped
+            if np.all(codes[1:] >= codes[:-1]):
+                grouped, grouped_codes = values, codes
+            else:
+                order = np.argsort(codes, kind='stable')
+                grouped, grouped_codes = values[order], codes[order]
+            starts = np.searchsorted(grouped_codes, np.arange(len(symbols)))
+            
+            # Per-run sums in float64; population std and unit scale for constant
+            # columns, as StandardScaler does
+            counts = np.bincount(codes, minlength=len(symbols))[:, None]
+            means = np.add.reduceat(grouped, starts, axis=0, dtype=np.float64) / counts
+            variances = np.add.reduceat(np.square(grouped - means[grouped_codes]), starts, axis=0) / counts
+            stds = np.sqrt(variances)
+            stds[stds == 0] = 1.0
+            for i, symbol in enumerate(symbols):
+                if symbol not in self.scalers:
+                    self.scalers[symbol] = _Standardizer(means[i], stds[i])
+        
+        # One broadcast over all rows, with each row's stats picked by its symbol code
+        means = np.stack([self.scalers[symbol].mean_ for symbol in symbols])
+        scales = np.stack([self.scalers[symbol].scale_ for symbol in symbols])
+        values -= means[codes]
+        values /= scales[codes]
+        df[feature_columns] = values
+        
+    def create_features_single_symbol(self, data: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, _Standardizer]:
+        """
+        Create features for one symbol's market data
+        
+        Runs in a worker process, so the fitted scaler is returned alongside the
+        features for the caller to store instead of living on a worker's copy.
+        
+        Args:
+            data: Dictionary containing a single symbol's market data DataFrame
+            
+        Returns:
+            Tuple of (features DataFrame, scaler fitted for the symbol)
+        """
+        df = self.create_features(data)
+        symbol = df['symbol'].iloc[0]
+        return df, self.scalers[symbol]
+        
     def prepare_features(self, data_dict: Dict[str, pd.DataFrame]) -> torch.Tensor:
         """
         Prepare features from all data sources
@@ -301,8 +438,12 @@ class FeatureEngineer:
             # Create features
             df = self.create_features(data_dict)
             
-            # Convert to tensor
-            features = torch.tensor(df.values, dtype=torch.float32)
+            # Select the numeric columns straight into one contiguous float32 block
+            # and wrap it without another copy
+            feature_columns = df.columns.drop(['symbol', 'timestamp'])
+            features = torch.from_numpy(
+                np.ascontiguousarray(df[feature_columns].to_numpy(dtype=np.float32))
+            )
             
             return features
             
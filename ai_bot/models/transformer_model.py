@@ -74,6 +74,9 @@ class CryptoTransformer(nn.Module):
         
     def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
         """Forward pass"""
+        # Inputs may be stored in a compact dtype (e.g. bfloat16); compute in the weights' dtype
+        x = x.to(self.input_embedding.weight.dtype)
+        
         # Input embedding
         x = self.input_embedding(x)
         
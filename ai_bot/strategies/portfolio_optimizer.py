@@ -3,9 +3,9 @@ import pandas as pd
 from scipy.optimize import minimize
 from typing import Dict, List, Tuple, Optional
 import cvxopt
+from sklearn.covariance import LedoitWolf
 from dataclasses import dataclass
 import logging
-from ..data_collectors.crypto_collector import CryptoDataCollector
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +29,6 @@ class ModernPortfolioOptimizer:
         self.risk_free_rate = config['trading']['risk_free_rate']
         self.target_volatility = config['trading']['target_volatility']
         self.max_position_size = config['trading']['max_position_size']
-        self.data_collector = CryptoDataCollector(self.symbols)
         
     async def optimize_portfolio(
         self,
@@ -191,5 +190,8 @@ class ModernPortfolioOptimizer:
         self,
         returns: pd.DataFrame
     ) -> pd.DataFrame:
-        """Calculate covariance matrix"""
-        return returns.cov()
+        """Calculate Ledoit-Wolf shrunk covariance matrix"""
+        # Shrinkage keeps the estimate well conditioned when there are few
+        # bars per symbol; precision isn't needed, so don't compute it
+        covariance = LedoitWolf(store_precision=False).fit(returns.to_numpy()).covariance_
+        return pd.DataFrame(covariance, index=returns.columns, columns=returns.columns)
@@ -1,3 +1,4 @@
+import torch
 import pytorch_lightning as pl
 from pytorch_lightning.callbacks import ModelCheckpoint, EarlyStopping, LearningRateMonitor
 from pytorch_lightning.loggers import WandbLogger
@@ -91,6 +92,15 @@ class ModelTrainer:
                 gradient_clip_val=self.config.get('training', {}).get('gradient_clip_val', 0.5)
             )
             
+            # Optionally fit through torch.compile; Lightning unwraps the compiled
+            # module for checkpoints, and it shares weights with `model`
+            fit_model = model
+            if self.config.get('training', {}).get('compile', False):
+                fit_model = torch.compile(
+                    model,
+                    mode=self.config.get('training', {}).get('compile_mode', 'reduce-overhead')
+                )
+            
             # Start MLflow run if configured
             if self.config.get('mlflow', {}).get('enabled', False):
                 with mlflow.start_run() as run:
@@ -98,10 +108,10 @@ class ModelTrainer:
                     mlflow.log_params(self.config)
                     
                     # Train model
-                    self.trainer.fit(model, data_module)
+                    self.trainer.fit(fit_model, data_module)
             else:
                 # Train model without MLflow
-                self.trainer.fit(model, data_module)
+                self.trainer.fit(fit_model, data_module)
                 
             return model
             
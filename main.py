@@ -25,24 +25,28 @@ async def main():
         # Initialize controller
         controller = TradingBotController(config_path=args.config)
         
-        if args.mode == 'train':
-            # Retrain model
-            logger.info("Starting model retraining...")
-            await controller.initialize()
-            logger.info("Model retraining completed")
+        try:
+            if args.mode == 'train':
+                # Retrain model
+                logger.info("Starting model retraining...")
+                await controller.initialize()
+                logger.info("Model retraining completed")
             
-        elif args.mode == 'optimize':
-            # Run hyperparameter optimization
-            logger.info("Starting hyperparameter optimization...")
-            await controller.initialize()
-            controller.optimize_hyperparameters(n_trials=args.trials)
-            logger.info("Hyperparameter optimization completed")
+            elif args.mode == 'optimize':
+                # Run hyperparameter optimization
+                logger.info("Starting hyperparameter optimization...")
+                await controller.initialize()
+                controller.optimize_hyperparameters(n_trials=args.trials)
+                logger.info("Hyperparameter optimization completed")
             
-        else:  # trade mode
-            # Start continuous trading
-            logger.info("Starting continuous trading...")
-            await controller.initialize()
-            await controller.start_continuous_trading(interval_seconds=args.interval)
+            else:  # trade mode
+                # Start continuous trading
+                logger.info("Starting continuous trading...")
+                await controller.initialize()
+                await controller.start_continuous_trading(interval_seconds=args.interval)
+        finally:
+            # Close the collector's HTTP session even when a mode fails or is interrupted
+            await controller.aclose()
             
     except KeyboardInterrupt:
         logger.info("Shutting down gracefully...")
@@ -0,0 +1,218 @@
+import asyncio
+import time
+
+import aiohttp
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_bot.data_collectors import crypto_collector
+from ai_bot.data_collectors.crypto_collector import (
+    CryptoDataCollector, KLINE_NUMERIC_COLUMNS, KLINES_HISTORY, KLINES_PAGE_SIZE
+)
+
+HOUR_MS = 3_600_000
+
+
+def _kline_row(open_ms: int) -> list:
+    """One raw Binance kline row with the open time encoded in the close price"""
+    return [open_ms, '1.0', '2.0', '0.5', str(open_ms), '10.0', open_ms + HOUR_MS - 1,
+            '15.0', 5, '5.0', '7.5', '0']
+
+
+def _history(first_ms: int, n: int) -> pd.DataFrame:
+    """Persisted kline history for BTCUSDT: n hourly candles from first_ms"""
+    open_ms = first_ms + HOUR_MS * np.arange(n, dtype=np.int64)
+    df = pd.DataFrame({
+        'timestamp': (open_ms * 1_000_000).view('datetime64[ns]'),
+        **{col: np.ones(n) for col in KLINE_NUMERIC_COLUMNS},
+        'symbol': 'BTC/USDT',
+    })
+    df['close'] = open_ms.astype(np.float64)
+    return df
+
+
+def test_gap_longer_than_one_page_is_paged(monkeypatch, tmp_path):
+    """Catching up on more than a page of candles pages forward until the current bar"""
+    monkeypatch.setattr(crypto_collector, 'CACHE_DIR', str(tmp_path))
+    collector = CryptoDataCollector(['BTC/USDT'], '1h')
+    current_bar = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    gap = KLINES_PAGE_SIZE + 500
+    collector._history['BTCUSDT'] = _history(current_bar - (gap + 999) * HOUR_MS, 1000)
+
+    calls = []
+
+    async def make_request(endpoint, params=None, signed=False):
+        calls.append(params)
+        assert params['limit'] <= KLINES_PAGE_SIZE
+        start = params['startTime']
+        stop = min(start + params['limit'] * HOUR_MS, current_bar + HOUR_MS)
+        return [_kline_row(ms) for ms in range(start, stop, HOUR_MS)]
+
+    monkeypatch.setattr(collector, '_make_request', make_request)
+    df = asyncio.run(collector._fetch_klines('BTCUSDT'))
+
+    assert len(calls) == 2
+    assert calls[0]['startTime'] == current_bar - gap * HOUR_MS
+    assert len(df) == KLINES_HISTORY
+    # Candles are contiguous up to the current bar, with no duplicates or holes
+    open_ms = df['timestamp'].to_numpy().astype(np.int64) // 1_000_000
+    np.testing.assert_array_equal(np.diff(open_ms), HOUR_MS)
+    assert open_ms[-1] == current_bar
+    np.testing.assert_array_equal(df['close'].to_numpy(), open_ms.astype(np.float64))
+
+
+def test_stale_history_refetches_full_window(monkeypatch, tmp_path):
+    """History older than the kept window is dropped and the whole window is paged in"""
+    monkeypatch.setattr(crypto_collector, 'CACHE_DIR', str(tmp_path))
+    collector = CryptoDataCollector(['BTC/USDT'], '1h')
+    current_bar = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    collector._history['BTCUSDT'] = _history(current_bar - 5 * KLINES_HISTORY * HOUR_MS, 10)
+
+    async def make_request(endpoint, params=None, signed=False):
+        start = params['startTime']
+        stop = min(start + params['limit'] * HOUR_MS, current_bar + HOUR_MS)
+        return [_kline_row(ms) for ms in range(start, stop, HOUR_MS)]
+
+    monkeypatch.setattr(collector, '_make_request', make_request)
+    df = asyncio.run(collector._fetch_klines('BTCUSDT'))
+
+    open_ms = df['timestamp'].to_numpy().astype(np.int64) // 1_000_000
+    assert len(df) == KLINES_HISTORY
+    assert open_ms[0] == current_bar - (KLINES_HISTORY - 1) * HOUR_MS
+    assert open_ms[-1] == current_bar
+
+
+def test_onchain_join_never_looks_ahead():
+    """Each candle gets the latest on-chain sample at or before it; earlier candles are dropped"""
+    candles = pd.date_range('2024-01-01', periods=10, freq='h')
+    market_data = pd.DataFrame({'timestamp': candles, 'close': np.arange(10.0), 'symbol': 'BTC/USDT'})
+    onchain_ts = [candles[2], candles[5], candles[6] + pd.Timedelta('30min'), candles[9] + pd.Timedelta('1h')]
+    onchain_data = pd.DataFrame(
+        {col: [2.0, 5.0, 6.5, 10.0] for col in crypto_collector.ONCHAIN_COLUMNS},
+        index=pd.DatetimeIndex(onchain_ts, name='timestamp'),
+    ).iloc[::-1]
+
+    combined = CryptoDataCollector._align_onchain(market_data, onchain_data)
+
+    np.testing.assert_array_equal(combined['timestamp'].to_numpy(), candles[2:].to_numpy())
+    np.testing.assert_array_equal(combined['gas_used'].to_numpy(), [2.0, 2.0, 2.0, 5.0, 5.0, 6.5, 6.5, 6.5])
+
+
+class _FakeResponse:
+    def __init__(self, status: int, data=None, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.request_info = None
+        self.history = ()
+        self._data = data
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(self.request_info, self.history, status=self.status)
+
+    async def json(self, loads=None):
+        return self._data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    """Answers each GET with the next scripted outcome and records which host was asked"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.hosts = []
+
+    def get(self, url, **kwargs):
+        self.hosts.append(url.split('//')[1].split('.')[0])
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _scripted_collector(monkeypatch, outcomes):
+    """Collector whose requests get the scripted outcomes; returns it, the session and the sleeps"""
+    collector = CryptoDataCollector(['BTC/USDT'], '1h')
+    session = _FakeSession(outcomes)
+    sleeps = []
+
+    async def get_session():
+        return session
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(collector, '_get_session', get_session)
+    monkeypatch.setattr(crypto_collector.asyncio, 'sleep', sleep)
+    monkeypatch.setattr(crypto_collector.random, 'random', lambda: 1.0)
+    return collector, session, sleeps
+
+
+def test_retries_after_a_failed_round_with_jittered_backoff(monkeypatch):
+    outcomes = [_FakeResponse(503)] * 4 + [_FakeResponse(200, data={'ok': True})]
+    collector, session, sleeps = _scripted_collector(monkeypatch, outcomes)
+
+    data = asyncio.run(collector._make_request('/api/v3/time', base=1.0))
+
+    assert data == {'ok': True}
+    assert session.hosts == ['api', 'api1', 'api2', 'api3', 'api']
+    assert sleeps == [1.5]  # base * 2**0 * (1 + 0.5 * jitter)
+
+
+def test_rate_limit_stops_failover_and_honours_retry_after(monkeypatch):
+    outcomes = [_FakeResponse(429, headers={'Retry-After': '5'}), _FakeResponse(200, data=[])]
+    collector, session, sleeps = _scripted_collector(monkeypatch, outcomes)
+
+    assert asyncio.run(collector._make_request('/api/v3/time')) == []
+    assert session.hosts == ['api', 'api']
+    assert sleeps == [5.0]
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    collector, session, sleeps = _scripted_collector(monkeypatch, [_FakeResponse(400)])
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(collector._make_request('/api/v3/klines'))
+    assert session.hosts == ['api']
+    assert sleeps == []
+
+
+def test_gives_up_after_max_retries_with_capped_delays(monkeypatch):
+    outcomes = [aiohttp.ClientConnectionError()] * 12
+    collector, session, sleeps = _scripted_collector(monkeypatch, outcomes)
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(collector._make_request('/api/v3/time', max_retries=3, base=2.0, cap=4.0))
+    assert len(session.hosts) == 12
+    assert sleeps == [3.0, 4.0]
+
+
+def test_failing_endpoint_cools_down_and_the_healthy_one_is_preferred(monkeypatch):
+    outcomes = [aiohttp.ClientConnectionError(), _FakeResponse(200, data=1), _FakeResponse(200, data=2)]
+    collector, session, sleeps = _scripted_collector(monkeypatch, outcomes)
+
+    assert asyncio.run(collector._make_request('/api/v3/time')) == 1
+    assert session.hosts == ['api', 'api1']
+    assert collector._preferred_base_url_idx == 1
+    assert collector._endpoint_cooldown_until[0] > time.time()
+
+    # The next request starts at the endpoint that answered
+    assert asyncio.run(collector._make_request('/api/v3/time')) == 2
+    assert session.hosts == ['api', 'api1', 'api1']
+    assert sleeps == []
+
+
+def test_endpoint_order_skips_cooling_endpoints_unless_all_are():
+    collector = CryptoDataCollector(['BTC/USDT'], '1h')
+    collector._preferred_base_url_idx = 2
+    collector._endpoint_cooldown_until[3] = time.time() + 60
+    assert collector._endpoint_order() == [2, 0, 1]
+
+    collector._endpoint_cooldown_until = [time.time() + 60] * 4
+    assert collector._endpoint_order() == [2, 3, 0, 1]
@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from ai_bot.data import data_module
+from ai_bot.data.data_module import CryptoDataModule
+
+SEQUENCE_LENGTH = 10
+PREDICTION_HORIZON = 2
+N_CANDLES = 300
+
+
+def _market_data(n: int) -> pd.DataFrame:
+    """Random-walk hourly candles for one symbol, shaped like the collector's output"""
+    rng = np.random.default_rng(0)
+    close = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.005, n)) * close
+    volume = rng.uniform(100, 1_000, n)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': volume,
+        'quote_volume': volume * close,
+        'trades': rng.integers(100, 1_000, n),
+        'taker_buy_volume': volume / 2,
+        'taker_buy_quote_volume': volume * close / 2,
+        'symbol': 'BTC/USDT',
+    })
+
+
+def test_latest_window_matches_training_window(monkeypatch):
+    """The inference window ending at a candle equals the training window ending at it"""
+    module = CryptoDataModule({
+        'data': {
+            'symbols': ['BTC/USDT'],
+            'timeframe': '1h',
+            'sequence_length': SEQUENCE_LENGTH,
+            'prediction_horizon': PREDICTION_HORIZON,
+        }
+    })
+    market_data = _market_data(N_CANDLES)
+
+    async def collect_training_data():
+        return market_data
+
+    monkeypatch.setattr(module.data_collector, 'collect_data', collect_training_data)
+    X, _, _ = asyncio.run(module._build_sequences())
+
+    # The last training window ends PREDICTION_HORIZON candles before the data
+    # does, since its target lies beyond it. Serve live data that ends there too.
+    async def collect_live_data():
+        return market_data.iloc[:-PREDICTION_HORIZON]
+
+    monkeypatch.setattr(module.data_collector, 'collect_data', collect_live_data)
+    latest = asyncio.run(module.get_latest_data())
+
+    np.testing.assert_allclose(latest[0].numpy(), X[-1].numpy(), rtol=1e-4, atol=1e-4)
+
+
+def _module(storage_dtype: str = 'bfloat16') -> CryptoDataModule:
+    return CryptoDataModule({
+        'data': {
+            'symbols': ['BTC/USDT'],
+            'timeframe': '1h',
+            'sequence_length': SEQUENCE_LENGTH,
+            'prediction_horizon': PREDICTION_HORIZON,
+            'storage_dtype': storage_dtype,
+        }
+    })
+
+
+def test_cache_key_covers_storage_dtype_and_feature_schema(monkeypatch):
+    """Sequences stored in another dtype or under other feature definitions are never reused"""
+    assert _module('bfloat16')._cache_path() != _module('float32')._cache_path()
+    before = _module()._cache_path()
+    monkeypatch.setattr(data_module, 'FEATURE_SCHEMA_VERSION', data_module.FEATURE_SCHEMA_VERSION + 1)
+    assert _module()._cache_path() != before
+
+
+def test_cache_hit_still_sets_market_data(monkeypatch, tmp_path):
+    """A run served from the sequence cache exposes the same market_data as a fresh one"""
+    monkeypatch.setattr(data_module, 'CACHE_DIR', str(tmp_path))
+    market_data = _market_data(N_CANDLES)
+    calls = []
+
+    async def collect_data():
+        calls.append(None)
+        return market_data
+
+    modules = [_module(), _module()]
+    for module in modules:
+        monkeypatch.setattr(module.data_collector, 'collect_data', collect_data)
+        monkeypatch.setattr(module, '_current_bar', lambda: 0)
+        asyncio.run(module.prepare_data())
+
+    assert len(calls) == 2
+    assert modules[1].market_data is market_data
+    assert len(modules[1].train_data) == len(modules[0].train_data)
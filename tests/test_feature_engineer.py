@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+from ta.volume import OnBalanceVolumeIndicator
+
+from ai_bot.features.feature_engineer import INDICATOR_WARMUP, FeatureEngineer
+
+
+def test_scale_features_matches_per_symbol_standard_scaler():
+    """Per-symbol standardization equals StandardScaler fit on each symbol's rows"""
+    rng = np.random.default_rng(0)
+    n = 200
+    # Symbols interleaved in random order, one of them with a single row
+    symbols = rng.choice(['BTC/USDT', 'ETH/USDT'], n)
+    symbols[rng.integers(n)] = 'SOL/USDT'
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+        'symbol': symbols,
+        'a': rng.normal(100, 20, n),
+        'b': rng.lognormal(0, 1, n),
+        'flat': np.full(n, 3.0),  # Zero variance within every symbol
+    })
+    feature_columns = pd.Index(['a', 'b', 'flat'])
+    values = df[feature_columns].to_numpy(dtype=np.float32).astype(np.float64)
+
+    engineer = FeatureEngineer()
+    engineer._scale_features(df, feature_columns, engineer._symbol_groups(df['symbol']))
+
+    for symbol in ('BTC/USDT', 'ETH/USDT', 'SOL/USDT'):
+        rows = symbols == symbol
+        expected = StandardScaler().fit_transform(values[rows])
+        np.testing.assert_allclose(df.loc[rows, feature_columns].to_numpy(), expected, rtol=1e-4, atol=1e-5)
+        scaler = engineer.scalers[symbol]
+        np.testing.assert_allclose(scaler.inverse_transform(expected), values[rows], rtol=1e-5)
+    assert (df.loc[symbols == 'SOL/USDT', feature_columns].to_numpy() == 0).all()
+    assert (df['flat'] == 0).all()
+
+
+def test_obv_matches_ta():
+    """OBV equals ta's indicator, including flat closes and the first row"""
+    rng = np.random.default_rng(0)
+    n = 300
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 1).astype(np.float32)
+    close[10:15] = close[9]  # A run of unchanged closes
+    volume = rng.uniform(100, 1_000, n).astype(np.float32)
+    symbol_data = pd.DataFrame({'close': close, 'volume': volume})
+
+    FeatureEngineer._volume_features(symbol_data)
+
+    expected = OnBalanceVolumeIndicator(
+        close=pd.Series(close, dtype=np.float64), volume=pd.Series(volume, dtype=np.float64)
+    ).on_balance_volume()
+    np.testing.assert_allclose(symbol_data['obv'].to_numpy(), expected.to_numpy(),
+                               rtol=1e-5, atol=1e-5 * volume.sum())
+
+
+def test_talib_and_ta_indicators_agree_past_warmup():
+    """Both indicator backends give the same columns once the warm-up rows are blanked"""
+    pytest.importorskip('talib')
+    rng = np.random.default_rng(0)
+    n = 600
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.005, n)) * close
+    candles = pd.DataFrame({
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+    }).astype(np.float32)
+
+    talib_data = candles.copy()
+    FeatureEngineer._talib_indicators(talib_data)
+    FeatureEngineer._trim_indicator_warmup(talib_data)
+    ta_data = candles.copy()
+    FeatureEngineer._ta_indicators(ta_data)
+    FeatureEngineer._trim_indicator_warmup(ta_data)
+
+    assert list(talib_data.columns) == list(ta_data.columns)
+    for col in talib_data.columns:
+        # float32 inputs; RSI is on a 0-100 scale and MACD is near zero, hence the absolute floor
+        np.testing.assert_allclose(talib_data[col].to_numpy(dtype=np.float64), ta_data[col].to_numpy(dtype=np.float64),
+                                   rtol=1e-3, atol=1e-3, equal_nan=True, err_msg=col)
+    assert talib_data.iloc[INDICATOR_WARMUP:].notna().all().all()
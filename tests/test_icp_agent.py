@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+pytest.importorskip('ic')
+ecdsa = pytest.importorskip('ecdsa')
+
+from ic.identity import Identity  # noqa: E402
+
+from ai_bot.execution import icp_agent  # noqa: E402
+from ai_bot.execution.icp_agent import load_dfx_identity  # noqa: E402
+
+
+def _write_identity(config_dir, name: str) -> str:
+    """Store a fresh secp256k1 identity the way dfx does and return its principal"""
+    pem = ecdsa.SigningKey.generate(curve=ecdsa.SECP256k1).to_pem().decode()
+    pem_dir = config_dir / 'identity' / name
+    pem_dir.mkdir(parents=True)
+    (pem_dir / 'identity.pem').write_text(pem)
+    return Identity.from_pem(pem).sender().to_str()
+
+
+def test_loads_the_identity_dfx_has_selected(monkeypatch, tmp_path):
+    monkeypatch.setattr(icp_agent, 'DFX_CONFIG_DIR', str(tmp_path))
+    _write_identity(tmp_path, 'default')
+    principal = _write_identity(tmp_path, 'deployer')
+    (tmp_path / 'identity.json').write_text(json.dumps({'default': 'deployer'}))
+
+    identity = load_dfx_identity()
+
+    assert identity.sender().to_str() == principal
+
+
+def test_missing_pem_fails_instead_of_signing_anonymously(monkeypatch, tmp_path):
+    monkeypatch.setattr(icp_agent, 'DFX_CONFIG_DIR', str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        load_dfx_identity('default')
+    with pytest.raises(FileNotFoundError):
+        load_dfx_identity(pem_path=str(tmp_path / 'exported.pem'))
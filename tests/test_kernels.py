@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('numba')
+
+from ai_bot.features._kernels import (  # noqa: E402
+    PRICE_FEATURE_COLUMNS, _pct_change, price_features_kernel, rolling_mean_std
+)
+
+N = 500
+# The kernels emit float32; the pandas references run in float64 on the same float32 inputs
+RTOL = 1e-4
+ATOL = 1e-6
+
+
+def _series_with_nans(seed: int) -> np.ndarray:
+    """Positive random-walk float32 series with scattered NaNs and a NaN lead-in"""
+    rng = np.random.default_rng(seed)
+    x = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, N)))).astype(np.float32)
+    x[rng.choice(N, 20, replace=False)] = np.nan
+    x[:3] = np.nan
+    return x
+
+
+def _assert_matches(actual: np.ndarray, expected: pd.Series) -> None:
+    expected = expected.to_numpy(dtype=np.float64)
+    # Same warm-up and same NaN holes, then equal values within float32 tolerance
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=RTOL, atol=ATOL, equal_nan=True)
+
+
+@pytest.mark.parametrize('k', [1, 4, 24])
+def test_pct_change_matches_pandas(k):
+    x = _series_with_nans(k)
+    out = np.empty(N, dtype=np.float32)
+    _pct_change(x, k, out)
+    _assert_matches(out, pd.Series(x).pct_change(periods=k, fill_method=None))
+    assert np.isnan(out[:k]).all()
+
+
+def test_price_features_kernel_matches_pandas():
+    close = _series_with_nans(0)
+    rng = np.random.default_rng(1)
+    open_ = (close * rng.uniform(0.99, 1.01, N)).astype(np.float32)
+    high = (np.fmax(open_, close) * 1.01).astype(np.float32)
+    low = (np.fmin(open_, close) * 0.99).astype(np.float32)
+
+    out = price_features_kernel(open_, high, low, close)
+
+    c = pd.Series(close)
+    expected = {
+        'price_change': c.pct_change(fill_method=None),
+        'price_change_1h': c.pct_change(periods=1, fill_method=None),
+        'price_change_4h': c.pct_change(periods=4, fill_method=None),
+        'price_change_24h': c.pct_change(periods=24, fill_method=None),
+        'high_low_ratio': pd.Series(high) / pd.Series(low),
+        'close_open_ratio': c / pd.Series(open_),
+    }
+    expected['volatility_1h'] = expected['price_change_1h'].astype(np.float64).rolling(window=1).std()
+    expected['volatility_4h'] = expected['price_change_4h'].astype(np.float64).rolling(window=4).std()
+    expected['volatility_24h'] = expected['price_change_24h'].astype(np.float64).rolling(window=24).std()
+
+    assert out.shape == (N, len(PRICE_FEATURE_COLUMNS))
+    for i, col in enumerate(PRICE_FEATURE_COLUMNS):
+        _assert_matches(out[:, i], expected[col])
+    # A one-row sample std is undefined (ddof=1), so volatility_1h is all NaN
+    assert np.isnan(out[:, PRICE_FEATURE_COLUMNS.index('volatility_1h')]).all()
+
+
+@pytest.mark.parametrize('w', [1, 2, 20, 50])
+def test_rolling_mean_std_matches_pandas(w):
+    x = _series_with_nans(w)
+    mean, std = rolling_mean_std(x, w)
+    rolling = pd.Series(x.astype(np.float64)).rolling(window=w)
+    _assert_matches(mean, rolling.mean())
+    _assert_matches(std, rolling.std())
+    # No value before the first full window after the NaN lead-in
+    assert np.isnan(mean[:w + 2]).all()
+
+
+def test_rolling_std_is_sample_std():
+    _, std = rolling_mean_std(np.array([1, 2, 4, 8], dtype=np.float32), 3)
+    np.testing.assert_allclose(std[2:], [np.std([1, 2, 4], ddof=1), np.std([2, 4, 8], ddof=1)], rtol=RTOL)
@@ -0,0 +1,144 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_bot.execution import trading_executor
+from ai_bot.execution.trading_executor import TradeHistoryBuffer, TradingExecutor
+from ai_bot.strategies.portfolio_optimizer import PortfolioMetrics
+
+CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config.json'
+
+
+def _executor(monkeypatch, flush_every: int = 10) -> TradingExecutor:
+    """Executor built from the repo config without a canister client"""
+    config = json.loads(CONFIG_PATH.read_text())
+    config['wandb']['flush_every'] = flush_every
+    monkeypatch.setattr(TradingExecutor, '_create_icp_client', lambda self: None)
+    return TradingExecutor(config, model=None)
+
+
+def _metrics(sharpe_ratio: float = 1.0, volatility: float = 0.1,
+             var_95: float = 0.05, max_drawdown: float = 0.1) -> PortfolioMetrics:
+    return PortfolioMetrics(
+        expected_return=0.1, volatility=volatility, sharpe_ratio=sharpe_ratio,
+        max_drawdown=max_drawdown, var_95=var_95, cvar_95=var_95, asset_weights={}
+    )
+
+
+class _FakeWandb:
+    def __init__(self):
+        self.calls = []
+
+    def log(self, row, step=None, commit=None):
+        self.calls.append((step, row))
+
+
+def test_metrics_flush_one_row_per_cycle(monkeypatch):
+    """Buffered cycles reach wandb as separate rows at their own steps, and close() flushes the rest"""
+    fake = _FakeWandb()
+    monkeypatch.setattr(trading_executor, 'WANDB_AVAILABLE', True)
+    monkeypatch.setattr(trading_executor, 'wandb', fake, raising=False)
+    executor = _executor(monkeypatch, flush_every=2)
+
+    for sharpe in (1.0, 2.0, 3.0):
+        executor._log_execution_metrics(None, _metrics(sharpe_ratio=sharpe), trades=[])
+    assert [step for step, _ in fake.calls] == [0, 1]
+
+    executor.close()
+    assert [step for step, _ in fake.calls] == [0, 1, 2]
+    assert [row['sharpe_ratio'] for _, row in fake.calls] == [1.0, 2.0, 3.0]
+
+
+def test_trade_history_wraps_oldest_first():
+    """Once full, the buffer keeps the newest trades and reads them back in order"""
+    symbols = ('BTC/USDT', 'ETH/USDT')
+    buffer = TradeHistoryBuffer(symbols, capacity=3)
+    start = np.datetime64('2024-01-01T00:00')
+    for i in range(2):
+        buffer.append(start + np.timedelta64(i, 'h'), i % 2, i % 2 == 0, float(i), 10.0 * i, (i, i, i, i))
+    assert len(buffer) == 2
+    assert buffer.to_frame()['amount'].tolist() == [0.0, 1.0]
+
+    for i in range(2, 5):
+        buffer.append(start + np.timedelta64(i, 'h'), i % 2, i % 2 == 0, float(i), 10.0 * i, (i, i, i, i))
+    frame = buffer.to_frame()
+
+    assert len(buffer) == 3
+    assert buffer.symbol_code.dtype == np.int8
+    assert frame['timestamp'].tolist() == [pd.Timestamp(start + np.timedelta64(i, 'h')) for i in (2, 3, 4)]
+    assert frame['symbol'].tolist() == ['BTC/USDT', 'ETH/USDT', 'BTC/USDT']
+    assert frame['action'].tolist() == ['buy', 'sell', 'buy']
+    assert frame['amount'].tolist() == [2.0, 3.0, 4.0]
+    assert frame['predicted_price'].tolist() == [20.0, 30.0, 40.0]
+    assert frame['max_drawdown'].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_trade_history_rejects_more_symbols_than_int8_codes():
+    with pytest.raises(ValueError):
+        TradeHistoryBuffer(tuple(f'S{i}/USDT' for i in range(129)))
+    TradeHistoryBuffer(tuple(f'S{i}/USDT' for i in range(128)))
+
+
+def _loop_trades(current_portfolio, target_portfolio, min_trade_size):
+    """The per-symbol loop _generate_trades replaced"""
+    trades = []
+    total_value = sum(current_portfolio.values())
+    for symbol in current_portfolio:
+        current_weight = current_portfolio[symbol] / total_value
+        target_weight = target_portfolio[symbol] / total_value
+        weight_diff = target_weight - current_weight
+        if abs(weight_diff) > min_trade_size:
+            trades.append({
+                'symbol': symbol,
+                'action': 'buy' if weight_diff > 0 else 'sell',
+                'amount': abs(weight_diff) * total_value,
+                'prediction': target_weight
+            })
+    return trades
+
+
+def test_generate_trades_matches_per_symbol_loop(monkeypatch):
+    executor = _executor(monkeypatch)
+    rng = np.random.default_rng(0)
+    symbols = [f'S{i}/USDT' for i in range(8)]
+    for _ in range(50):
+        current = dict(zip(symbols, rng.uniform(0, 1_000, len(symbols)).tolist()))
+        target = dict(zip(symbols, rng.uniform(0, 1_000, len(symbols)).tolist()))
+
+        trades = executor._generate_trades(current, target)
+        expected = _loop_trades(current, target, executor._min_trade_size)
+
+        assert [(t['symbol'], t['action']) for t in trades] == [(t['symbol'], t['action']) for t in expected]
+        for trade, ref in zip(trades, expected):
+            assert trade['amount'] == pytest.approx(ref['amount'])
+            assert trade['prediction'] == pytest.approx(ref['prediction'])
+        assert executor._last_trade_volume == pytest.approx(sum(t['amount'] for t in expected))
+
+
+def _loop_risk_check(metrics, trading):
+    """The sequential threshold checks _validate_risk_metrics replaced"""
+    return not (
+        metrics.volatility > trading['max_volatility']
+        or abs(metrics.var_95) > trading['max_var']
+        or metrics.max_drawdown > trading['max_drawdown']
+        or metrics.sharpe_ratio < trading['min_sharpe_ratio']
+    )
+
+
+def test_risk_check_matches_sequential_thresholds(monkeypatch):
+    """Values below, at and above every limit, including negative VaR, give the old verdict"""
+    executor = _executor(monkeypatch)
+    trading = executor.config['trading']
+
+    def around(limit):
+        return (limit - 0.01, limit, limit + 0.01)
+
+    for volatility in around(trading['max_volatility']):
+        for var_95 in (*around(trading['max_var']), -trading['max_var'] - 0.01):
+            for max_drawdown in around(trading['max_drawdown']):
+                for sharpe_ratio in around(trading['min_sharpe_ratio']):
+                    metrics = _metrics(sharpe_ratio, volatility, var_95, max_drawdown)
+                    assert executor._validate_risk_metrics(metrics) == _loop_risk_check(metrics, trading)